@@ -33,7 +33,7 @@ def simulate_fixed_unit(
     max_dd = 0.0
     n_bets = 0
     n_wins = 0
-    daily = {}
+    daily = []  # (date, bankroll) at end of each day, in date order
     monthly_pnl = defaultdict(float)
     losing_streak = 0
     max_losing = 0
@@ -65,7 +65,11 @@ def simulate_fixed_unit(
             peak = bankroll
         dd = (peak - bankroll) / peak if peak > 0 else 0
         max_dd = max(max_dd, dd)
-        daily[bet["date"]] = bankroll
+        # Bets are date-sorted: overwrite today's snapshot or start a new day
+        if daily and daily[-1][0] == bet["date"]:
+            daily[-1] = (bet["date"], bankroll)
+        else:
+            daily.append((bet["date"], bankroll))
 
     return {
         "initial": initial,
@@ -79,7 +83,7 @@ def simulate_fixed_unit(
         "peak": round(peak, 2),
         "unit": unit,
         "monthly_pnl": dict(sorted(monthly_pnl.items())),
-        "daily": dict(sorted(daily.items())),
+        "daily": dict(daily),
     }
 
 
@@ -98,7 +102,7 @@ def simulate_progressive(
     max_dd = 0.0
     n_bets = 0
     n_wins = 0
-    daily = {}
+    daily = []  # (date, bankroll) at end of each day, in date order
     monthly_pnl = defaultdict(float)
     losing_streak = 0
     max_losing = 0
@@ -136,7 +140,11 @@ def simulate_progressive(
             peak = bankroll
         dd = (peak - bankroll) / peak if peak > 0 else 0
         max_dd = max(max_dd, dd)
-        daily[bet["date"]] = bankroll
+        # Bets are date-sorted: overwrite today's snapshot or start a new day
+        if daily and daily[-1][0] == bet["date"]:
+            daily[-1] = (bet["date"], bankroll)
+        else:
+            daily.append((bet["date"], bankroll))
 
     return {
         "initial": initial,
@@ -150,7 +158,7 @@ def simulate_progressive(
         "peak": round(peak, 2),
         "total_staked": round(total_staked, 2),
         "monthly_pnl": dict(sorted(monthly_pnl.items())),
-        "daily": dict(sorted(daily.items())),
+        "daily": dict(daily),
     }
 
 
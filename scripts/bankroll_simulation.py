@@ -6,19 +6,87 @@ using various staking strategies on the bet history.
 
 import json
 import sys
-from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional: without it the decorated loops run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 
 def load_bets(path: str) -> list[dict]:
-    with open(path) as f:
-        bets = json.load(f)
+    if orjson is not None:
+        bets = orjson.loads(Path(path).read_bytes())
+    else:
+        with open(path) as f:
+            bets = json.load(f)
     bets.sort(key=lambda b: b["date"])
     return bets
 
 
+# One packed record per bet (18 bytes, vs several hundred for a bet dict).
+# Inputs are float32; bankroll series stay float64 because compounded
+# bankrolls here exceed the float32 range (~3.4e38).
+BET_DTYPE = np.dtype([
+    ("date_idx", np.int32),
+    ("market_code", np.int8),
+    ("edge_pct", np.float32),
+    ("model_prob", np.float32),
+    ("best_odds", np.float32),
+    ("won", np.bool_),
+])
+
+
+def bets_to_arrays(bets: list[dict]) -> dict[str, np.ndarray]:
+    """Convert a date-sorted list of bet dicts into a packed record array.
+
+    The returned dict holds the record array under "records" plus one view per
+    BET_DTYPE field, so callers index columns by name without copying.
+    Market types are stored as small int codes ("market_code") indexing into
+    the sorted "market_types" array, so market filters compare ints, not strings.
+    Bets without a "market_type" get "" and so never pass a market filter.
+    Dates are stored the same way: "date_idx" indexes into the sorted "days"
+    array, and is non-decreasing since bets are sorted by date.
+    """
+    market_types, market_code = np.unique(
+        np.array([b.get("market_type", "") for b in bets]), return_inverse=True,
+    )
+    days, date_idx = np.unique(np.array([b["date"] for b in bets]), return_inverse=True)
+
+    records = np.empty(len(bets), dtype=BET_DTYPE)
+    records["date_idx"] = date_idx
+    records["market_code"] = market_code
+    records["edge_pct"] = [b["edge_pct"] for b in bets]
+    records["model_prob"] = [b["model_prob"] for b in bets]
+    records["best_odds"] = [b["best_odds"] for b in bets]
+    records["won"] = [bool(b["won"]) for b in bets]
+
+    return {
+        "records": records,
+        "days": days,
+        "market_types": market_types,
+        **{name: records[name] for name in BET_DTYPE.names},
+    }
+
+
+def load_bets_arrays(path: str) -> dict[str, np.ndarray]:
+    """Load bet history as column arrays, sorted by date."""
+    return bets_to_arrays(load_bets(path))
+
+
 def kelly_fraction(model_prob: float, odds: float) -> float:
     """Full Kelly stake as fraction of bankroll."""
     if odds <= 1.0 or model_prob <= 0:
@@ -29,8 +97,134 @@ def kelly_fraction(model_prob: float, odds: float) -> float:
     return max(f, 0.0)
 
 
+def kelly_fraction_vec(model_prob: np.ndarray, odds: np.ndarray) -> np.ndarray:
+    """Vectorized kelly_fraction over arrays of probabilities and odds."""
+    b = odds - 1.0
+    valid = (b > 0) & (model_prob > 0)
+    f = (model_prob * b - (1.0 - model_prob)) / np.where(valid, b, 1.0)
+    return np.where(valid, np.maximum(f, 0.0), 0.0)
+
+
+def _simulate_flat(
+    odds: np.ndarray,
+    won: np.ndarray,
+    initial_bankroll: float,
+    flat_pct: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flat staking: the bankroll is a running product of per-bet factors.
+
+    The product is taken in log space (cumsum of log1p factors), which stays
+    accurate over long streaks where a plain cumprod drifts or overflows.
+    Returns (placed mask, bankroll after each placed bet, stake of each placed bet).
+    """
+    log_factors = np.where(won, np.log1p(flat_pct * (odds - 1.0)), np.log1p(-flat_pct))
+    after = initial_bankroll * np.exp(np.cumsum(log_factors, dtype=np.float64))
+    before = np.concatenate(([initial_bankroll], after[:-1]))
+
+    # Stop at the first bet where the bankroll is too low (< 1) or the stake
+    # rounds to nothing: the bankroll can no longer move after that point.
+    stop = np.flatnonzero((before < 1.0) | (before * flat_pct < 0.01))
+    n = int(stop[0]) if stop.size else len(odds)
+
+    placed = np.zeros(len(odds), dtype=bool)
+    placed[:n] = True
+    return placed, after[:n], before[:n] * flat_pct
+
+
+def _make_kelly_loop(kelly_frac: float, max_stake_pct: float):
+    """Fractional Kelly staking loop with its constants baked in.
+
+    The recurrence is path-dependent (stake depends on the current bankroll),
+    so it stays a loop; compiling it per (kelly_frac, max_stake_pct) lets
+    numba fold both constants into the loop body.
+    """
+
+    @njit(cache=True, fastmath=True)
+    def kelly_loop(kf, odds, won, initial_bankroll):
+        n = len(odds)
+        placed = np.zeros(n, dtype=np.bool_)
+        after = np.empty(n)
+        stakes = np.empty(n)
+        bankroll = initial_bankroll
+
+        for i in range(n):
+            if bankroll < 1.0:
+                break
+            stake = bankroll * kf[i] * kelly_frac
+            stake = min(stake, bankroll * max_stake_pct)
+            if stake < 0.01:
+                continue
+
+            if won[i]:
+                bankroll += stake * (odds[i] - 1.0)
+            else:
+                bankroll -= stake
+            placed[i] = True
+            after[i] = bankroll
+            stakes[i] = stake
+
+        return placed, after[placed], stakes[placed]
+
+    return kelly_loop
+
+
+@lru_cache(maxsize=None)
+def make_simulator(
+    strategy: str,
+    flat_pct: float = 0.02,
+    kelly_frac: float = 0.25,
+    max_stake_pct: float = 0.05,
+):
+    """Build the staking kernel for one strategy configuration.
+
+    The returned function takes (model_prob, best_odds, won, initial_bankroll)
+    for the filtered bets and returns (placed mask, bankroll after each placed
+    bet, stake of each placed bet). Kernels are cached per configuration.
+    """
+    if strategy == "flat":
+        def run(probs, odds, won, initial_bankroll):
+            return _simulate_flat(odds, won, initial_bankroll, flat_pct)
+    elif strategy == "kelly":
+        kelly_loop = _make_kelly_loop(kelly_frac, max_stake_pct)
+
+        def run(probs, odds, won, initial_bankroll):
+            return kelly_loop(kelly_fraction_vec(probs, odds), odds, won, initial_bankroll)
+    else:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    return run
+
+
+def _drawdown_stats(bankroll_series: np.ndarray, initial_bankroll: float) -> tuple[float, float]:
+    """Max drawdown (fraction of running peak) and peak bankroll of an equity curve."""
+    curve = np.concatenate(([initial_bankroll], bankroll_series))
+    peaks = np.maximum.accumulate(curve)
+    safe_peaks = np.where(peaks > 0, peaks, 1.0)
+    dd = np.where(peaks > 0, (peaks - curve) / safe_peaks, 0.0)
+    return float(dd.max()), float(peaks[-1])
+
+
+def _longest_losing_streak(won: np.ndarray) -> int:
+    """Length of the longest run of consecutive losses."""
+    # Pad with wins so every losing run has a start (-1) and an end (+1) edge
+    edges = np.diff(np.concatenate(([1], won.astype(np.int8), [1])))
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    return int((ends - starts).max(initial=0))
+
+
+def _date_window(bets: dict[str, np.ndarray], start: str | None, end: str | None) -> slice:
+    """Slice of bets dated within [start, end], found by binary search."""
+    date_idx = bets["date_idx"]
+    lo, hi = 0, len(date_idx)
+    if start is not None:
+        lo = np.searchsorted(date_idx, np.searchsorted(bets["days"], start), side="left")
+    if end is not None:
+        hi = np.searchsorted(date_idx, np.searchsorted(bets["days"], end, side="right"), side="left")
+    return slice(int(lo), int(hi))
+
+
 def simulate(
-    bets: list[dict],
+    bets: dict[str, np.ndarray],
     initial_bankroll: float = 1000.0,
     strategy: str = "flat",
     flat_pct: float = 0.02,
@@ -38,11 +232,13 @@ def simulate(
     max_stake_pct: float = 0.05,
     market_filter: list[str] | None = None,
     min_edge: float = 5.0,
+    start: str | None = None,
+    end: str | None = None,
 ) -> dict:
     """Simulate bankroll evolution.
 
     Args:
-        bets: List of bet dicts from backtest.
+        bets: Bet history as column arrays (see load_bets_arrays).
         initial_bankroll: Starting capital.
         strategy: "flat" (fixed % of current bankroll) or "kelly" (fractional Kelly).
         flat_pct: Stake as % of bankroll for flat strategy.
@@ -50,70 +246,45 @@ def simulate(
         max_stake_pct: Maximum stake as % of bankroll (cap for Kelly).
         market_filter: Only bet on these market types (e.g. ["corner_1x2"]).
         min_edge: Minimum edge % to place bet.
+        start: Only bets on or after this date (YYYY-MM-DD).
+        end: Only bets on or before this date (YYYY-MM-DD).
 
     Returns:
         Dict with equity curve, stats, etc.
     """
-    bankroll = initial_bankroll
-    peak = initial_bankroll
-    max_drawdown = 0.0
-    equity_curve = [(None, initial_bankroll)]  # (date, bankroll)
-    daily_bankroll = {}
-    n_bets = 0
-    n_wins = 0
-    total_staked = 0.0
-    longest_losing = 0
-    current_losing = 0
-
-    for bet in bets:
-        # Filter by market
-        if market_filter and bet["market_type"] not in market_filter:
-            continue
-        # Filter by edge
-        if bet["edge_pct"] < min_edge:
-            continue
-        # Skip if bankroll too low
-        if bankroll < 1.0:
-            break
-
-        # Calculate stake
-        if strategy == "flat":
-            stake = bankroll * flat_pct
-        elif strategy == "kelly":
-            kf = kelly_fraction(bet["model_prob"], bet["best_odds"])
-            stake = bankroll * kf * kelly_frac
-            stake = min(stake, bankroll * max_stake_pct)
-        else:
-            raise ValueError(f"Unknown strategy: {strategy}")
-
-        if stake < 0.01:
-            continue
-
-        # Place bet
-        n_bets += 1
-        total_staked += stake
-
-        if bet["won"]:
-            profit = stake * (bet["best_odds"] - 1.0)
-            bankroll += profit
-            n_wins += 1
-            current_losing = 0
-        else:
-            bankroll -= stake
-            current_losing += 1
-            longest_losing = max(longest_losing, current_losing)
+    # Restrict to the date window: a contiguous slice since bets are date-sorted
+    window = _date_window(bets, start, end)
+
+    # Filter by edge and market
+    mask = bets["edge_pct"][window] >= min_edge
+    if market_filter:
+        allowed_codes = np.flatnonzero(np.isin(bets["market_types"], market_filter))
+        mask &= np.isin(bets["market_code"][window], allowed_codes.astype(np.int8))
+
+    odds = bets["best_odds"][window][mask]
+    won = bets["won"][window][mask]
+    date_idx = bets["date_idx"][window][mask]
+
+    run = make_simulator(strategy, flat_pct, kelly_frac, max_stake_pct)
+    placed, bankroll_series, stakes = run(
+        bets["model_prob"][window][mask], odds, won, initial_bankroll,
+    )
 
-        # Track peak and drawdown
-        if bankroll > peak:
-            peak = bankroll
-        dd = (peak - bankroll) / peak
-        max_drawdown = max(max_drawdown, dd)
+    won = won[placed]
+    date_idx = date_idx[placed]
+    n_bets = len(bankroll_series)
+    n_wins = int(won.sum())
+    total_staked = float(stakes.sum())
+    bankroll = float(bankroll_series[-1]) if n_bets else initial_bankroll
 
-        # Daily snapshot
-        daily_bankroll[bet["date"]] = bankroll
+    max_drawdown, peak = _drawdown_stats(bankroll_series, initial_bankroll)
 
-    # Build equity curve from daily snapshots
-    equity_curve = [(d, v) for d, v in sorted(daily_bankroll.items())]
+    # Daily snapshots: last bankroll of each day
+    last_of_day = np.append(date_idx[1:] != date_idx[:-1], True)[:n_bets]
+    equity_curve = list(zip(
+        bets["days"][date_idx[last_of_day]].tolist(),
+        bankroll_series[last_of_day].tolist(),
+    ))
 
     # Stats
     total_profit = bankroll - initial_bankroll
@@ -130,12 +301,17 @@ def simulate(
         "n_wins": n_wins,
         "win_rate": round(win_rate, 1),
         "max_drawdown_pct": round(max_drawdown * 100, 1),
-        "longest_losing_streak": longest_losing,
+        "longest_losing_streak": _longest_losing_streak(won),
         "peak_bankroll": round(peak, 2),
         "equity_curve": equity_curve,
     }
 
 
+def simulate_from_list(bets: list[dict], **kwargs) -> dict:
+    """Run simulate() on a list of bet dicts (see simulate for kwargs)."""
+    return simulate(bets_to_arrays(bets), **kwargs)
+
+
 def print_report(result: dict, label: str) -> None:
     print(f"\n{'='*60}")
     print(f"  {label}")
@@ -155,13 +331,12 @@ def print_report(result: dict, label: str) -> None:
     curve = result["equity_curve"]
     if curve:
         print(f"\n  --- Evolution mensuelle ---")
-        months_seen = set()
-        for date_str, val in curve:
-            month = date_str[:7]  # YYYY-MM
-            if month not in months_seen:
-                months_seen.add(month)
-                pct = ((val - result["initial_bankroll"]) / result["initial_bankroll"]) * 100
-                print(f"    {month}: {val:>10,.2f} EUR ({pct:>+7.1f}%)")
+        curve_df = pd.DataFrame(curve, columns=["date", "val"])
+        monthly = curve_df.groupby(pd.to_datetime(curve_df["date"]).dt.to_period("M"))["val"].first()
+        initial = result["initial_bankroll"]
+        for month, val in monthly.items():
+            pct = ((val - initial) / initial) * 100
+            print(f"    {month}: {val:>10,.2f} EUR ({pct:>+7.1f}%)")
 
 
 def print_ascii_chart(result: dict, width: int = 60) -> None:
@@ -170,9 +345,9 @@ def print_ascii_chart(result: dict, width: int = 60) -> None:
     if not curve or len(curve) < 2:
         return
 
-    values = [v for _, v in curve]
-    min_val = min(values) * 0.95
-    max_val = max(values) * 1.05
+    values = np.array([v for _, v in curve])
+    min_val = values.min() * 0.95
+    max_val = values.max() * 1.05
     val_range = max_val - min_val
     if val_range == 0:
         return
@@ -181,21 +356,21 @@ def print_ascii_chart(result: dict, width: int = 60) -> None:
     step = max(1, len(values) // width)
     sampled = values[::step]
 
+    # One broadcast comparison for the whole grid: rows are thresholds, top to bottom
+    height = 15
+    rows = np.arange(height, -1, -1)
+    thresholds = min_val + (rows / height) * val_range
+    grid = np.where(sampled[None, :] >= thresholds[:, None], "#", " ")
+
     print(f"\n  --- Courbe de capital ---")
     print(f"  {max_val:>8,.0f} |")
-    height = 15
-    for row in range(height, -1, -1):
-        threshold = min_val + (row / height) * val_range
-        line = "  " + " " * 8 + " |"
-        for v in sampled:
-            if v >= threshold:
-                line += "#"
-            else:
-                line += " "
+    for row, cells in zip(rows, grid):
         if row == height // 2:
             mid = min_val + 0.5 * val_range
-            line = f"  {mid:>8,.0f} |" + line[12:]
-        print(line)
+            prefix = f"  {mid:>8,.0f} |"
+        else:
+            prefix = "  " + " " * 8 + " |"
+        print(prefix + "".join(cells))
     print(f"  {min_val:>8,.0f} |" + "-" * len(sampled))
     print(f"           {curve[0][0][:7]}" + " " * max(0, len(sampled) - 20) + f"{curve[-1][0][:7]}")
 
@@ -206,7 +381,8 @@ def main():
         print(f"Error: {bets_path} not found")
         sys.exit(1)
 
-    bets = load_bets(str(bets_path))
+    # Loaded once as column arrays; each strategy only builds its own mask
+    bets = load_bets_arrays(str(bets_path))
     initial = 1000.0
 
     print("\n" + "=" * 70)
@@ -293,7 +469,7 @@ def main():
         )
 
     print(f"\n  Capital initial: {initial:,.0f} EUR")
-    print(f"  Periode: {bets[0]['date']} - {bets[-1]['date']}")
+    print(f"  Periode: {bets['days'][0]} - {bets['days'][-1]}")
 
 
 if __name__ == "__main__":
@@ -34,6 +34,40 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from src.data.odds_api import OddsAPIClient, extract_best_odds, remove_margin
 
 
+ODDS_COLUMNS = [
+    "collected_at", "commence_time", "home_team", "away_team",
+    "home_odds", "home_bookmaker", "draw_odds", "draw_bookmaker",
+    "away_odds", "away_bookmaker", "over25_odds", "under25_odds",
+    "fair_home", "fair_draw", "fair_away", "overround", "league",
+]
+
+# (event id, per-bookmaker last_update) -> (best odds, fair probabilities)
+_ODDS_CACHE: dict[tuple, tuple[dict, dict]] = {}
+
+
+def _best_and_fair(match: dict) -> tuple[dict, dict]:
+    """extract_best_odds + remove_margin, memoized on the bookmaker snapshot.
+
+    The Odds API stamps every bookmaker with last_update, so an unchanged
+    snapshot of the same event always yields the same best/fair odds.
+    """
+    key = (
+        match.get("id", ""),
+        tuple(
+            (bk.get("key", bk.get("title")), bk.get("last_update", ""))
+            for bk in match.get("bookmakers", [])
+        ),
+    )
+    cached = _ODDS_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    best = extract_best_odds(match)
+    fair = remove_margin(best["home"]["odds"], best["draw"]["odds"], best["away"]["odds"])
+    _ODDS_CACHE[key] = (best, fair)
+    return best, fair
+
+
 def collect_odds(league: str = "ligue_1", dry_run: bool = False) -> pd.DataFrame:
     """Fetch current odds and return as DataFrame."""
     load_dotenv(PROJECT_ROOT / ".env")
@@ -59,68 +93,74 @@ def collect_odds(league: str = "ligue_1", dry_run: bool = False) -> pd.DataFrame
     print(f"Fetched odds for {len(odds_data)} matches")
     print(f"API requests remaining: {client.remaining_requests}/500")
 
-    rows = []
+    # Built column by column: one list per field instead of one dict per row
+    cols = {name: [] for name in ODDS_COLUMNS}
+    collected_at = datetime.now(timezone.utc).isoformat()
     for match in odds_data:
-        best = extract_best_odds(match)
+        best, fair = _best_and_fair(match)
 
         # Skip matches without H2H odds
         if best["home"]["odds"] == 0 or best["draw"]["odds"] == 0 or best["away"]["odds"] == 0:
             continue
 
-        fair = remove_margin(best["home"]["odds"], best["draw"]["odds"], best["away"]["odds"])
-
-        rows.append({
-            "collected_at": datetime.now(timezone.utc).isoformat(),
-            "commence_time": match.get("commence_time", ""),
-            "home_team": match.get("home_team", ""),
-            "away_team": match.get("away_team", ""),
-            "home_odds": best["home"]["odds"],
-            "home_bookmaker": best["home"]["bookmaker"],
-            "draw_odds": best["draw"]["odds"],
-            "draw_bookmaker": best["draw"]["bookmaker"],
-            "away_odds": best["away"]["odds"],
-            "away_bookmaker": best["away"]["bookmaker"],
-            "over25_odds": best["over25"]["odds"],
-            "under25_odds": best["under25"]["odds"],
-            "fair_home": round(fair["home"], 4),
-            "fair_draw": round(fair["draw"], 4),
-            "fair_away": round(fair["away"], 4),
-            "overround": round(fair["overround"], 4),
-            "league": league,
-        })
+        cols["collected_at"].append(collected_at)
+        cols["commence_time"].append(match.get("commence_time", ""))
+        cols["home_team"].append(match.get("home_team", ""))
+        cols["away_team"].append(match.get("away_team", ""))
+        for outcome in ("home", "draw", "away"):
+            cols[f"{outcome}_odds"].append(best[outcome]["odds"])
+            cols[f"{outcome}_bookmaker"].append(best[outcome]["bookmaker"])
+        cols["over25_odds"].append(best["over25"]["odds"])
+        cols["under25_odds"].append(best["under25"]["odds"])
+        cols["fair_home"].append(round(fair["home"], 4))
+        cols["fair_draw"].append(round(fair["draw"], 4))
+        cols["fair_away"].append(round(fair["away"], 4))
+        cols["overround"].append(round(fair["overround"], 4))
+        cols["league"].append(league)
 
     client.close()
-    return pd.DataFrame(rows)
+    return pd.DataFrame(cols)
+
+
+DEDUP_KEYS = ["home_team", "away_team", "commence_time", "_date"]
 
 
 def save_odds(df_new: pd.DataFrame, odds_dir: Path) -> None:
-    """Append new odds to history CSV, avoiding duplicates."""
+    """Append new odds to history CSV, avoiding duplicates.
+
+    Only the dedup key columns of the existing history are read back, and new
+    rows are appended in place instead of rewriting the whole file.
+    """
     odds_dir.mkdir(parents=True, exist_ok=True)
     history_path = odds_dir / "odds_history.csv"
 
+    # Deduplicate: same match + same day = skip. collected_at is ISO-8601 UTC,
+    # so its first 10 characters are the collection date.
+    df_new = df_new.copy()
+    df_new["_date"] = df_new["collected_at"].str[:10]
+    df_new = df_new.drop_duplicates(subset=DEDUP_KEYS, keep="first")
+
     if history_path.exists():
-        df_existing = pd.read_csv(history_path)
-        # Deduplicate: same match + same day = skip
-        df_existing["_date"] = pd.to_datetime(df_existing["collected_at"]).dt.date
-        df_new["_date"] = pd.to_datetime(df_new["collected_at"]).dt.date
-
-        merged = pd.concat([df_existing, df_new], ignore_index=True)
-        merged = merged.drop_duplicates(
-            subset=["home_team", "away_team", "commence_time", "_date"],
-            keep="first",
+        columns = pd.read_csv(history_path, nrows=0).columns.tolist()
+        df_keys = pd.read_csv(
+            history_path,
+            usecols=["home_team", "away_team", "commence_time", "collected_at"],
         )
-        merged = merged.drop(columns=["_date"])
-        new_count = len(merged) - len(df_existing)
+        df_keys["_date"] = df_keys["collected_at"].str[:10]
+        seen = set(df_keys[DEDUP_KEYS].itertuples(index=False, name=None))
+
+        is_new = [key not in seen for key in df_new[DEDUP_KEYS].itertuples(index=False, name=None)]
+        df_append = df_new.loc[is_new, columns]
+        df_append.to_csv(history_path, mode="a", header=False, index=False)
+        total = len(df_keys) + len(df_append)
     else:
-        merged = df_new
-        if "_date" in merged.columns:
-            merged = merged.drop(columns=["_date"])
-        new_count = len(merged)
+        df_append = df_new.drop(columns=["_date"])
+        df_append.to_csv(history_path, index=False)
+        total = len(df_append)
 
-    merged.to_csv(history_path, index=False)
     print(f"\nSaved to {history_path}")
-    print(f"  New entries: {new_count}")
-    print(f"  Total entries: {len(merged)}")
+    print(f"  New entries: {len(df_append)}")
+    print(f"  Total entries: {total}")
 
 
 def main():
@@ -11,14 +11,24 @@ Usage:
     python scripts/fetch_results.py
 """
 import csv
-import io
 import json
-from datetime import datetime, timezone
-from difflib import SequenceMatcher
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from email.utils import formatdate
 from pathlib import Path
 
 import httpx
+import numpy as np
 from loguru import logger
+from rapidfuzz import fuzz, process, utils
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ---------------------------------------------------------------------------
 # Paths
@@ -27,6 +37,25 @@ PROJECT_ROOT = Path(__file__).parent.parent
 PREDICTIONS_FILE = PROJECT_ROOT / "web" / "public" / "predictions.json"
 HISTORY_FILE = PROJECT_ROOT / "data" / "results" / "history.json"
 PUBLIC_HISTORY_FILE = PROJECT_ROOT / "web" / "public" / "history.json"
+CSV_CACHE_DIR = PROJECT_ROOT / "data" / "cache" / "results"
+
+# Cached CSVs of the season in progress are re-checked after this many seconds;
+# CSVs saved after their season ended never change and are always reused.
+CSV_CACHE_MAX_AGE = 6 * 3600
+
+# football-data.co.uk columns used to match and resolve predictions
+CSV_COLUMNS = ("Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG")
+
+# Mean home/away name similarity (0-1) a CSV row needs to count as the match,
+# and the similarity (0-100) each side needs on its own, so one exact team name
+# cannot carry a wrong opponent. Calibrated on the football-data.org and
+# API-Football names mapped to 2024-25 CSV names: no correct match is lost,
+# and a wrong opponent is accepted half as often as with the old difflib score.
+MIN_MATCH_SCORE = 0.60
+MIN_SIDE_SIMILARITY = 35
+
+# Concurrent CSV downloads (one per league+season)
+MAX_DOWNLOAD_WORKERS = 8
 
 # ---------------------------------------------------------------------------
 # League → football-data.co.uk code mapping
@@ -40,9 +69,17 @@ LEAGUE_CODE_MAP = {
 }
 
 
-def _season_suffix(date_str: str) -> str:
-    """Return season code like '2526' from an ISO date string."""
-    dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+def _parse_kickoff(pred: dict) -> datetime:
+    """Parse a prediction's ISO kickoff once, memoized on the prediction dict."""
+    dt = pred.get("_kickoff_dt")
+    if dt is None:
+        # Python 3.11+ fromisoformat accepts the trailing "Z"
+        dt = pred["_kickoff_dt"] = datetime.fromisoformat(pred["kickoff"])
+    return dt
+
+
+def _season_suffix(dt: datetime) -> str:
+    """Return season code like '2526' from a kickoff datetime."""
     year = dt.year
     month = dt.month
     # Season starts in July/August
@@ -51,130 +88,254 @@ def _season_suffix(date_str: str) -> str:
     return f"{str(year - 1)[2:]}{str(year)[2:]}"
 
 
-def _download_csv(league_code: str, season: str) -> list[dict]:
-    """Download and parse a football-data.co.uk CSV file."""
+def _season_end(season: str) -> datetime:
+    """Return the date after which a season's CSV is final (1 July of its end year)."""
+    return datetime(2000 + int(season[2:]), 7, 1, tzinfo=timezone.utc)
+
+
+def _fetch_csv(league_code: str, season: str) -> Path:
+    """Return the cached path of a football-data.co.uk CSV, downloading it unless fresh.
+
+    Downloads are streamed straight to disk, so the CSV never sits in memory as a
+    whole response body.
+    """
     url = f"https://www.football-data.co.uk/mmz4281/{season}/{league_code}.csv"
+    cache_path = CSV_CACHE_DIR / f"{league_code}_{season}.csv"
+
+    headers = {}
+    if cache_path.exists():
+        mtime = cache_path.stat().st_mtime
+        if mtime >= _season_end(season).timestamp() or time.time() - mtime < CSV_CACHE_MAX_AGE:
+            logger.info(f"Loading cached {cache_path}")
+            return cache_path
+        # Stale: let the server answer 304 if the file has not changed since
+        headers["If-Modified-Since"] = formatdate(mtime, usegmt=True)
+
     logger.info(f"Downloading {url}")
-    try:
-        resp = httpx.get(url, timeout=30, follow_redirects=True)
+    with httpx.stream("GET", url, headers=headers, timeout=30, follow_redirects=True) as resp:
+        if resp.status_code == 304:
+            cache_path.touch()
+            return cache_path
         resp.raise_for_status()
-        reader = csv.DictReader(io.StringIO(resp.text))
-        # Only keep rows with full-time results
-        return [row for row in reader if row.get("FTHG") and row.get("FTAG")]
+
+        CSV_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".csv.tmp")
+        with open(tmp, "wb") as f:
+            for chunk in resp.iter_bytes(65536):
+                f.write(chunk)
+    os.replace(tmp, cache_path)
+    return cache_path
+
+
+def _parse_csv_date(raw_date: str) -> date | None:
+    """Parse a football-data.co.uk date (DD/MM/YYYY or DD/MM/YY)."""
+    parts = raw_date.split("/")
+    if len(parts) != 3:
+        return None
+    d, m, y = parts
+    if len(y) == 2:
+        y = "20" + y
+    try:
+        return date(int(y), int(m), int(d))
+    except ValueError:
+        return None
+
+
+def _download_csv(league_code: str, season: str) -> list[dict]:
+    """Download (or load from cache) and parse a football-data.co.uk CSV file."""
+    try:
+        path = _fetch_csv(league_code, season)
+        # Recent seasons are UTF-8 with a byte-order mark; the file is read lazily
+        with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            missing = [col for col in CSV_COLUMNS if col not in header]
+            if missing:
+                raise ValueError(f"missing columns {missing}")
+            # Only the few columns we need, located once from the header
+            i_date, i_home, i_away, i_fthg, i_ftag = (header.index(col) for col in CSV_COLUMNS)
+            width = max(i_date, i_home, i_away, i_fthg, i_ftag) + 1
+
+            # Parse dates and normalize team names once per CSV rather than once per
+            # prediction scan. Rows without a full-time result or with a malformed
+            # date can never be matched.
+            rows = []
+            for fields in reader:
+                if len(fields) < width or not fields[i_fthg] or not fields[i_ftag]:
+                    continue
+                row_date = _parse_csv_date(fields[i_date])
+                if row_date is None:
+                    continue
+                rows.append({
+                    "HomeTeam": fields[i_home],
+                    "AwayTeam": fields[i_away],
+                    "FTHG": fields[i_fthg],
+                    "FTAG": fields[i_ftag],
+                    "_date": row_date,
+                    "_home_norm": utils.default_process(fields[i_home]),
+                    "_away_norm": utils.default_process(fields[i_away]),
+                })
     except Exception as exc:
         logger.warning(f"Failed to fetch {league_code}/{season}: {exc}")
         return []
+    return rows
 
 
-def _similarity(a: str, b: str) -> float:
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+def _download_all(keys: set[tuple[str, str]]) -> dict[tuple[str, str], list[dict]]:
+    """Download (or load from cache) several (league_code, season) CSVs in parallel."""
+    keys = sorted(keys)
+    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as pool:
+        return dict(zip(keys, pool.map(lambda key: _download_csv(*key), keys)))
 
 
-def _find_match(rows: list[dict], home_team: str, away_team: str, date_str: str) -> dict | None:
-    """Find the best-matching row in a CSV for a given match."""
-    dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-    target_date = dt.date()
+def _contains_either(a: str, b: str) -> bool:
+    return bool(a) and bool(b) and (a in b or b in a)
 
-    best_row = None
-    best_score = 0.0
 
-    for row in rows:
-        # Parse date (DD/MM/YYYY or DD/MM/YY)
-        raw_date = row.get("Date", "")
-        try:
-            parts = raw_date.split("/")
-            if len(parts) == 3:
-                d, m, y = parts
-                if len(y) == 2:
-                    y = "20" + y
-                row_date = datetime(int(y), int(m), int(d)).date()
-                # Allow ±2 days for timezone/postponed-match tolerance
-                if abs((row_date - target_date).days) > 2:
-                    continue
-        except Exception:
+def _find_matches(rows: list[dict], queries: list[tuple[str, str, date]]) -> list[dict | None]:
+    """Find the best-matching CSV row for each (home_team, away_team, date) query.
+
+    Queries against the same CSV are scored together: queries that need fuzzy
+    matching get one (queries × rows) similarity matrix per side, masked to
+    each query's date window.
+    """
+    matches: list[dict | None] = [None] * len(queries)
+    if not rows or not queries:
+        return matches
+
+    home_norms = [row["_home_norm"] for row in rows]
+    away_norms = [row["_away_norm"] for row in rows]
+    home_qs = [utils.default_process(home_team) for home_team, _, _ in queries]
+    away_qs = [utils.default_process(away_team) for _, away_team, _ in queries]
+
+    # Allow ±2 days for timezone/postponed-match tolerance
+    row_days = np.array([row["_date"].toordinal() for row in rows])
+    target_days = np.array([target_date.toordinal() for _, _, target_date in queries])
+    in_window = np.abs(row_days[None, :] - target_days[:, None]) <= 2
+
+    pending = []
+    for q, (home_q, away_q) in enumerate(zip(home_qs, away_qs)):
+        candidates = np.flatnonzero(in_window[q]).tolist()
+        if not candidates:
             continue
 
-        home_sim = _similarity(home_team, row.get("HomeTeam", ""))
-        away_sim = _similarity(away_team, row.get("AwayTeam", ""))
-        score = (home_sim + away_sim) / 2
+        # Fast path: identical normalized names need no fuzzy scoring
+        exact = next(
+            (i for i in candidates if home_norms[i] == home_q and away_norms[i] == away_q), None,
+        )
+        if exact is not None:
+            matches[q] = rows[exact]
+            continue
 
-        if score > best_score:
-            best_score = score
-            best_row = row
+        # Second tier: one unambiguous row whose names contain (or are contained in)
+        # both queries, e.g. "leverkusen" vs "bayer leverkusen"
+        contained = [
+            i for i in candidates
+            if _contains_either(home_q, home_norms[i]) and _contains_either(away_q, away_norms[i])
+        ]
+        if len(contained) == 1:
+            matches[q] = rows[contained[0]]
+            continue
 
-    if best_score >= 0.60 and best_row:
-        return best_row
-    return None
+        pending.append(q)
+
+    if pending:
+        # Score all remaining queries at once, only against rows inside at least
+        # one of their date windows, then take the first best in each window.
+        # Both sides must reach MIN_SIDE_SIMILARITY, so rapidfuzz may give up
+        # early on a pair that won't.
+        window = in_window[pending]
+        cols = np.flatnonzero(window.any(axis=0))
+        home_sims = process.cdist(
+            [home_qs[q] for q in pending], [home_norms[i] for i in cols],
+            scorer=fuzz.ratio, dtype=np.float64, score_cutoff=MIN_SIDE_SIMILARITY,
+        )
+        away_sims = process.cdist(
+            [away_qs[q] for q in pending], [away_norms[i] for i in cols],
+            scorer=fuzz.ratio, dtype=np.float64, score_cutoff=MIN_SIDE_SIMILARITY,
+        )
+        both_sides = (home_sims >= MIN_SIDE_SIMILARITY) & (away_sims >= MIN_SIDE_SIMILARITY)
+        scores = np.where(window[:, cols] & both_sides, (home_sims + away_sims) / 200.0, -1.0)
+        best = scores.argmax(axis=1)
+        for q, j, score in zip(pending, best.tolist(), scores[np.arange(len(pending)), best].tolist()):
+            if score >= MIN_MATCH_SCORE:
+                matches[q] = rows[cols[j]]
+
+    return matches
+
+
+# bet → (win rule, push rule) on goal difference (home − away) and total goals
+BET_RULES = {
+    "home": (lambda diff, total: diff > 0, None),
+    "draw": (lambda diff, total: diff == 0, None),
+    "away": (lambda diff, total: diff < 0, None),
+    "over15": (lambda diff, total: total >= 2, None),
+    "under15": (lambda diff, total: total <= 1, None),
+    "over25": (lambda diff, total: total >= 3, None),
+    "under25": (lambda diff, total: total <= 2, None),
+    "over35": (lambda diff, total: total >= 4, None),
+    "under35": (lambda diff, total: total <= 3, None),
+    "dc_1x": (lambda diff, total: diff >= 0, None),
+    "dc_x2": (lambda diff, total: diff <= 0, None),
+    "dc_12": (lambda diff, total: diff != 0, None),
+    "dnb_home": (lambda diff, total: diff > 0, lambda diff, total: diff == 0),
+    "dnb_away": (lambda diff, total: diff < 0, lambda diff, total: diff == 0),
+    "spread_home_m15": (lambda diff, total: diff >= 2, None),
+    "spread_away_p15": (lambda diff, total: diff <= 1, None),  # away wins, draw, or home by 1
+    "spread_home_m25": (lambda diff, total: diff >= 3, None),
+    "spread_away_p25": (lambda diff, total: diff <= 2, None),
+    # Default ±1.5 line: home must win by 2+, away covers otherwise
+    "ah_home": (lambda diff, total: diff >= 2, None),
+    "ah_away": (lambda diff, total: diff <= 1, None),
+}
+BET_CODES = {bet: code for code, bet in enumerate(BET_RULES)}
+
+# Outcome codes returned by _resolve_bets_batch
+WON, LOST, PUSH = 1, 0, -1
 
 
-def _resolve_bet(bet: str, home_score: int, away_score: int, odds: float) -> tuple[bool | None, float]:
-    """Determine if a bet won (None = push). Returns (won, pnl).
+def _resolve_bets_batch(
+    bets: list[str], home_scores: list[int], away_scores: list[int], odds: list[float],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Determine the outcome of many bets at once. Returns (won, pnl) arrays.
 
+    won is int8: WON (1), LOST (0) or PUSH (-1); unknown bet types are pushes.
     pnl is profit/loss on a 1-unit stake:
       won  → odds − 1
       lost → −1
       push → 0
     """
-    total = home_score + away_score
-    diff = home_score - away_score
-
-    won: bool | None
-    match bet:
-        case "home":
-            won = diff > 0
-        case "draw":
-            won = diff == 0
-        case "away":
-            won = diff < 0
-        case "over15":
-            won = total >= 2
-        case "under15":
-            won = total <= 1
-        case "over25":
-            won = total >= 3
-        case "under25":
-            won = total <= 2
-        case "over35":
-            won = total >= 4
-        case "under35":
-            won = total <= 3
-        case "dc_1x":
-            won = diff >= 0
-        case "dc_x2":
-            won = diff <= 0
-        case "dc_12":
-            won = diff != 0
-        case "dnb_home":
-            won = True if diff > 0 else (None if diff == 0 else False)
-        case "dnb_away":
-            won = True if diff < 0 else (None if diff == 0 else False)
-        case "spread_home_m15":
-            won = diff >= 2
-        case "spread_away_p15":
-            won = diff <= 1   # away wins, draw, or home by 1
-        case "spread_home_m25":
-            won = diff >= 3
-        case "spread_away_p25":
-            won = diff <= 2
-        case "ah_home":
-            # Default -1.5 line: home must win by 2+
-            won = diff >= 2
-        case "ah_away":
-            # Default +1.5 line: away covers if home doesn't win by 2+
-            won = diff <= 1
-        case _:
-            return None, 0.0
-
-    if won is None:
-        pnl = 0.0
-    elif won:
-        pnl = round(odds - 1.0, 4)
-    else:
-        pnl = -1.0
-
+    codes = np.array([BET_CODES.get(bet, -1) for bet in bets], dtype=np.int8)
+    home = np.asarray(home_scores, dtype=np.int64)
+    away = np.asarray(away_scores, dtype=np.int64)
+    odds = np.asarray(odds, dtype=np.float64)
+    diff = home - away
+    total = home + away
+
+    won = np.full(len(codes), PUSH, dtype=np.int8)
+    for bet, code in BET_CODES.items():
+        mask = codes == code
+        if not mask.any():
+            continue
+        win_rule, push_rule = BET_RULES[bet]
+        d, t = diff[mask], total[mask]
+        outcome = win_rule(d, t).astype(np.int8)
+        if push_rule is not None:
+            outcome[push_rule(d, t)] = PUSH
+        won[mask] = outcome
+
+    pnl = np.where(won == WON, np.round(odds - 1.0, 4), np.where(won == LOST, -1.0, 0.0))
     return won, pnl
 
 
+def _write_atomic(path: Path, payload: bytes) -> None:
+    """Write a file via a temporary sibling so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+
+
 def main() -> None:
     # ------------------------------------------------------------------
     # Load predictions
@@ -196,7 +357,9 @@ def main() -> None:
         with open(HISTORY_FILE, encoding="utf-8") as f:
             history = json.load(f)
 
-    existing_ids = {h["id"] for h in history}
+    # Keyed index of the history by match id: membership checks for new predictions,
+    # and the place new resolved and pending records are written back to
+    history_by_id: dict[str, dict] = {h["id"]: h for h in history}
 
     # ------------------------------------------------------------------
     # Find past predictions not yet recorded
@@ -205,8 +368,8 @@ def main() -> None:
     to_resolve = [
         p for p in predictions
         if p.get("recommended_bet")
-        and datetime.fromisoformat(p["kickoff"].replace("Z", "+00:00")) < now
-        and p["match_id"] not in existing_ids
+        and _parse_kickoff(p) < now
+        and p["match_id"] not in history_by_id
     ]
 
     if not to_resolve:
@@ -215,10 +378,25 @@ def main() -> None:
         logger.info(f"Resolving {len(to_resolve)} past prediction(s)...")
 
     # ------------------------------------------------------------------
-    # Fetch results (cache CSV per league+season)
+    # Fetch results: every league+season CSV needed, downloaded concurrently
     # ------------------------------------------------------------------
-    csv_cache: dict[str, list[dict]] = {}
-
+    buckets: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    for p in to_resolve:
+        if p.get("league") in LEAGUE_CODE_MAP:
+            buckets[(LEAGUE_CODE_MAP[p["league"]], _season_suffix(_parse_kickoff(p)))].append(p)
+
+    csv_cache = _download_all(set(buckets))
+
+    # Match each league+season bucket against its CSV in one batch
+    for key, preds in buckets.items():
+        rows = _find_matches(csv_cache[key], [
+            (p.get("home_team", ""), p.get("away_team", ""), _parse_kickoff(p).date())
+            for p in preds
+        ])
+        for p, row in zip(preds, rows):
+            p["_csv_row"] = row
+
+    settled: list[dict] = []
     for pred in to_resolve:
         league = pred.get("league", "")
         kickoff = pred.get("kickoff", "")
@@ -232,14 +410,7 @@ def main() -> None:
             logger.warning(f"Unknown league '{league}' — skipping {home_team} vs {away_team}")
             continue
 
-        season = _season_suffix(kickoff)
-        cache_key = f"{league_code}_{season}"
-
-        if cache_key not in csv_cache:
-            csv_cache[cache_key] = _download_csv(league_code, season)
-
-        rows = csv_cache[cache_key]
-        row = _find_match(rows, home_team, away_team, kickoff)
+        row = pred["_csv_row"]
 
         base_record: dict = {
             "id": match_id,
@@ -257,7 +428,7 @@ def main() -> None:
 
         if not row:
             logger.warning(f"No CSV result found for {home_team} vs {away_team} ({kickoff[:10]})")
-            history.append({**base_record, "resolved": False})
+            history_by_id[match_id] = {**base_record, "resolved": False}
             continue
 
         try:
@@ -265,39 +436,48 @@ def main() -> None:
             away_score = int(row["FTAG"])
         except (KeyError, ValueError):
             logger.warning(f"Invalid score data for {home_team} vs {away_team}")
-            history.append({**base_record, "resolved": False})
+            history_by_id[match_id] = {**base_record, "resolved": False}
             continue
 
-        odds = base_record["odds"] or 2.0
-        won, pnl = _resolve_bet(recommended_bet, home_score, away_score, odds)
-
-        status = "WIN" if won is True else ("PUSH" if won is None else "LOSS")
-        logger.info(
-            f"  {home_team} {home_score}–{away_score} {away_team} | "
-            f"{recommended_bet} | {status} | pnl={pnl:+.2f}"
-        )
-
-        history.append({
+        # Outcome filled in below, once every bet has been scored in one batch
+        record = {
             **base_record,
             "home_score": home_score,
             "away_score": away_score,
-            "won": won,
-            "pnl": pnl,
+            "won": None,
+            "pnl": 0.0,
             "resolved": True,
-        })
+        }
+        history_by_id[match_id] = record
+        settled.append(record)
+
+    if settled:
+        won, pnl = _resolve_bets_batch(
+            [r["recommended_bet"] for r in settled],
+            [r["home_score"] for r in settled],
+            [r["away_score"] for r in settled],
+            [r["odds"] or 2.0 for r in settled],
+        )
+        for record, outcome, profit in zip(settled, won.tolist(), pnl.tolist()):
+            record["won"] = None if outcome == PUSH else outcome == WON
+            record["pnl"] = profit
+            status = {WON: "WIN", LOST: "LOSS", PUSH: "PUSH"}[outcome]
+            logger.info(
+                f"  {record['home_team']} {record['home_score']}–{record['away_score']} "
+                f"{record['away_team']} | {record['recommended_bet']} | {status} | pnl={profit:+.2f}"
+            )
 
     # ------------------------------------------------------------------
     # Sort chronologically and save
     # ------------------------------------------------------------------
-    history.sort(key=lambda x: x.get("date", ""))
-
-    HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    history = sorted(history_by_id.values(), key=lambda x: x.get("date", ""))
 
-    PUBLIC_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(PUBLIC_HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        payload = orjson.dumps(history, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(history, indent=2, ensure_ascii=False).encode("utf-8")
+    for path in (HISTORY_FILE, PUBLIC_HISTORY_FILE):
+        _write_atomic(path, payload)
 
     # ------------------------------------------------------------------
     # Print summary
@@ -10,17 +10,28 @@ Usage:
 """
 
 import argparse
+import contextlib
+import hashlib
+import io
 import json
+import os
+import pickle
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from scripts.optimize_market import collect_raw_data, grid_search
+from scripts.optimize_market import RawData, collect_raw_data, grid_search
 from src.data.football_data_uk import load_historical_data, build_multi_market_odds
 
 
@@ -28,10 +39,121 @@ LEAGUES = ["premier_league", "la_liga", "bundesliga", "serie_a", "ligue_1"]
 MARKETS = ["home", "draw", "away", "over25", "under25", "ah_home", "ah_away"]
 SEASONS = [2021, 2022, 2023, 2024, 2025]
 
+# collect_raw_data output, pickled per (league, seasons, market)
+RAW_DATA_CACHE_DIR = PROJECT_ROOT / "data" / "cache" / "optimize"
+
+
+def _captured(fn, *args, **kwargs) -> tuple:
+    """Call fn (in a worker process), returning its result and its printed log."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        result = fn(*args, **kwargs)
+    return result, buf.getvalue()
+
+
+def _raw_data_cache_key(league: str, seasons: list[int], market: str) -> str:
+    """Hash everything collect_raw_data's output depends on.
+
+    Besides the arguments, that is the historical CSVs and the model code, so
+    their modification times invalidate the cache.
+    """
+    sources = [
+        *(PROJECT_ROOT / "data" / "historical").glob("*.csv"),
+        PROJECT_ROOT / "scripts" / "optimize_market.py",
+        *(PROJECT_ROOT / "src" / "models").glob("*.py"),
+        *(PROJECT_ROOT / "src" / "data").glob("*.py"),
+    ]
+    version = max((p.stat().st_mtime for p in sources), default=0.0)
+    key = f"{league}|{sorted(seasons)}|{market}|{version}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _cached_collect_raw_data(
+    league: str, seasons: list[int], market: str, matches: list[dict], odds_data: dict,
+) -> RawData:
+    """collect_raw_data, reusing the pickled result of an earlier run when still valid."""
+    key = _raw_data_cache_key(league, seasons, market)
+    cache_path = RAW_DATA_CACHE_DIR / f"{league}_{market}_{key}.pkl"
+    if cache_path.exists():
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+
+    raw_data = collect_raw_data(matches, odds_data, target_market=market)
+
+    RAW_DATA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_suffix(".pkl.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(raw_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache_path)
+    return raw_data
+
+
+def _run_market(
+    league: str, seasons: list[int], market: str, matches: list[dict], odds_data: dict, min_bets: int,
+) -> dict | None:
+    """Collect raw data and grid-search one market. Returns None if data is insufficient."""
+    print(f"\n  --- {market.upper()} ---")
+    t0 = time.time()
+
+    try:
+        raw_data = _cached_collect_raw_data(league, seasons, market, matches, odds_data)
+    except Exception as e:
+        print(f"  [ERROR] collect_raw_data failed: {e}")
+        return None
+
+    elapsed = time.time() - t0
+    print(f"  {len(raw_data)} matches with valid data ({elapsed:.1f}s)")
+
+    if len(raw_data) < min_bets:
+        print(f"  [SKIP] Not enough data (< {min_bets})")
+        return None
+
+    # Grid search
+    grid_results = grid_search(raw_data)
+    grid_results = [r for r in grid_results if r["n_bets"] >= min_bets]
+
+    if not grid_results:
+        print(f"  [SKIP] No valid combinations with >= {min_bets} bets")
+        return None
+
+    # Best by PnL then ROI (max keeps the first of equal keys, like a stable sort)
+    best = max(grid_results, key=lambda r: (r["total_pnl"], r["roi"]))
+
+    # Also find the "safest positive" — best ROI among profitable configs with >= 30 bets
+    safe_best = max(
+        (r for r in grid_results if r["total_pnl"] > 0 and r["n_bets"] >= 30),
+        key=lambda r: r["roi"],
+        default=None,
+    )
+
+    print(f"  BEST: {best['strategy']:<12} edge={best['edge_threshold']:>4.0f}% "
+          f"min_p={best['min_prob']:.2f} -> {best['n_bets']} bets, "
+          f"{best['total_pnl']:+.1f}u, {best['roi']:+.1%}")
+
+    if safe_best and safe_best != best:
+        print(f"  SAFE: {safe_best['strategy']:<12} edge={safe_best['edge_threshold']:>4.0f}% "
+              f"min_p={safe_best['min_prob']:.2f} -> {safe_best['n_bets']} bets, "
+              f"{safe_best['total_pnl']:+.1f}u, {safe_best['roi']:+.1%}")
+
+    return {
+        "best": best,
+        "safe": safe_best,
+        "total_combos": len(grid_results),
+    }
+
 
-def run_league(league: str, seasons: list[int], markets: list[str] | None = None, min_bets: int = 15) -> dict:
+def run_league(
+    league: str,
+    seasons: list[int],
+    markets: list[str] | None = None,
+    min_bets: int = 15,
+    workers: int = 1,
+) -> dict:
     """Run optimizer for all markets in a single league.
 
+    Markets are independent once the league data is loaded; with workers > 1
+    they run in that many worker processes.
+
     Returns dict: market -> best result dict (or None if insufficient data).
     """
     print(f"\n{'#'*80}")
@@ -47,63 +169,23 @@ def run_league(league: str, seasons: list[int], markets: list[str] | None = None
     if markets is None:
         markets = MARKETS
 
-    results = {}
-
-    for market in markets:
-        print(f"\n  --- {market.upper()} ---")
-        t0 = time.time()
-
-        try:
-            raw_data = collect_raw_data(matches, odds_data, target_market=market)
-        except Exception as e:
-            print(f"  [ERROR] collect_raw_data failed: {e}")
-            results[market] = None
-            continue
-
-        elapsed = time.time() - t0
-        print(f"  {len(raw_data)} matches with valid data ({elapsed:.1f}s)")
-
-        if len(raw_data) < min_bets:
-            print(f"  [SKIP] Not enough data (< {min_bets})")
-            results[market] = None
-            continue
-
-        # Grid search
-        grid_results = grid_search(raw_data)
-        grid_results = [r for r in grid_results if r["n_bets"] >= min_bets]
-
-        if not grid_results:
-            print(f"  [SKIP] No valid combinations with >= {min_bets} bets")
-            results[market] = None
-            continue
-
-        # Sort by PnL then ROI
-        grid_results.sort(key=lambda r: (r["total_pnl"], r["roi"]), reverse=True)
-        best = grid_results[0]
-
-        # Also find the "safest positive" — best ROI among profitable configs with >= 30 bets
-        safe_results = [r for r in grid_results if r["total_pnl"] > 0 and r["n_bets"] >= 30]
-        safe_best = None
-        if safe_results:
-            safe_results.sort(key=lambda r: r["roi"], reverse=True)
-            safe_best = safe_results[0]
-
-        print(f"  BEST: {best['strategy']:<12} edge={best['edge_threshold']:>4.0f}% "
-              f"min_p={best['min_prob']:.2f} -> {best['n_bets']} bets, "
-              f"{best['total_pnl']:+.1f}u, {best['roi']:+.1%}")
-
-        if safe_best and safe_best != best:
-            print(f"  SAFE: {safe_best['strategy']:<12} edge={safe_best['edge_threshold']:>4.0f}% "
-                  f"min_p={safe_best['min_prob']:.2f} -> {safe_best['n_bets']} bets, "
-                  f"{safe_best['total_pnl']:+.1f}u, {safe_best['roi']:+.1%}")
-
-        results[market] = {
-            "best": best,
-            "safe": safe_best,
-            "total_combos": len(grid_results),
-        }
-
-    return results
+    if workers > 1 and len(markets) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(markets))) as pool:
+            futures = [
+                pool.submit(_captured, _run_market, league, seasons, market, matches, odds_data, min_bets)
+                for market in markets
+            ]
+            outcomes = []
+            for future in futures:
+                result, log = future.result()
+                print(log, end="")
+                outcomes.append(result)
+    else:
+        outcomes = [
+            _run_market(league, seasons, market, matches, odds_data, min_bets) for market in markets
+        ]
+
+    return dict(zip(markets, outcomes))
 
 
 def main():
@@ -123,9 +205,25 @@ def main():
     all_results = {}
     total_t0 = time.time()
 
-    for league in args.leagues:
-        league_results = run_league(league, SEASONS, markets=markets, min_bets=args.min_bets)
-        all_results[league] = league_results
+    # Leagues are independent: run them in parallel, one process each, and
+    # split the remaining cores between each league's markets. Every league's
+    # log is printed as one block once it finishes.
+    cpus = os.cpu_count() or 1
+    league_workers = min(len(args.leagues), cpus)
+    market_workers = max(1, cpus // league_workers)
+    with ProcessPoolExecutor(max_workers=league_workers) as pool:
+        futures = {
+            pool.submit(
+                _captured, run_league, league, SEASONS,
+                markets=markets, min_bets=args.min_bets, workers=market_workers,
+            ): league
+            for league in args.leagues
+        }
+        for future in as_completed(futures):
+            league_results, log = future.result()
+            print(log, end="", flush=True)
+            all_results[futures[future]] = league_results
+    all_results = {league: all_results[league] for league in args.leagues}
 
     total_elapsed = time.time() - total_t0
 
@@ -238,14 +336,13 @@ def main():
 
     # Save results to JSON for later analysis
     output_path = PROJECT_ROOT / "data" / "results" / "optimization_results.json"
-    serializable = {}
-    for league, markets in all_results.items():
-        serializable[league] = {}
-        for market, data in markets.items():
-            serializable[league][market] = data
-
-    with open(output_path, "w") as f:
-        json.dump(serializable, f, indent=2)
+    if orjson is not None:
+        output_path.write_bytes(
+            orjson.dumps(all_results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
+    else:
+        with open(output_path, "w") as f:
+            json.dump(all_results, f, indent=2)
     print(f"\n  Results saved to {output_path}")
 
 
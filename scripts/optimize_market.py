@@ -14,20 +14,32 @@ Usage:
 import argparse
 import sys
 import time
+from dataclasses import dataclass
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # numba is optional: without it the decorated kernels are not used
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.data.football_data_uk import load_historical_data, build_multi_market_odds
-from src.data.odds_api import remove_margin
-from src.models.prop_models import remove_margin_2way
 from src.models.dixon_coles import DixonColesModel, MatchResult
 from src.models.elo import EloRating, EloMatch
 from src.models.ensemble import EnsemblePredictor
-from src.models.features import MatchHistory, compute_features, features_to_array
+from src.models.features import FEATURE_NAMES, MatchHistory, compute_features, features_to_array
 from src.models.xgb_model import XGBStackingModel
 from src.models.xgb_props import XGBPropModel
 from src.models.calibrator import ProbabilityCalibrator
@@ -37,6 +49,124 @@ from src.models.calibrator import ProbabilityCalibrator
 # Data collection: walk-forward loop (runs ONCE)
 # ---------------------------------------------------------------------------
 
+# (matrix size, AH line) -> boolean mask of scorelines where the home side covers
+_AH_MASKS: dict[tuple[int, float], np.ndarray] = {}
+
+
+@njit(cache=True)
+def _ah_cover_kernel(matrix: np.ndarray, ah_line: float) -> float:
+    """Compiled cell loop for _ah_cover_prob: no mask or fancy-index copy."""
+    n_goals = matrix.shape[0]
+    p = 0.0
+    for gi in range(n_goals):
+        for gj in range(n_goals):
+            if gi + ah_line > gj:
+                p += matrix[gi, gj]
+    return p
+
+
+def _ah_cover_prob(matrix: np.ndarray, ah_line: float) -> float:
+    """P(home goals + ah_line > away goals) from a DC score matrix."""
+    if HAVE_NUMBA:
+        # compiled kernels already hand back a Python float
+        return _ah_cover_kernel(np.ascontiguousarray(matrix, dtype=np.float64), float(ah_line))
+
+    n_goals = matrix.shape[0]
+    mask = _AH_MASKS.get((n_goals, ah_line))
+    if mask is None:
+        goals = np.arange(n_goals)
+        mask = _AH_MASKS[(n_goals, ah_line)] = goals[:, None] + ah_line > goals[None, :]
+    return float(matrix[mask].sum())
+
+
+def _fair_prob_table(odds_data: dict, target_market: str) -> dict[str, float]:
+    """Margin-free probability of target_market for every match in odds_data.
+
+    Pinnacle odds are de-margined for all matches in one vectorized pass (same
+    math as remove_margin / remove_margin_2way); 0.0 where the market's odds are
+    missing or not all above 1.0.
+    """
+    if target_market in ("home", "draw", "away"):
+        sides, col = ("home", "draw", "away"), ("home", "draw", "away").index(target_market)
+    elif target_market in ("over25", "under25"):
+        sides, col = ("over", "under"), 0 if target_market == "over25" else 1
+    else:
+        sides, col = ("home", "away"), 0 if target_market == "ah_home" else 1
+
+    keys = list(odds_data)
+    pins = np.zeros((len(keys), len(sides)))
+    for r, key in enumerate(keys):
+        odds = odds_data[key]
+        is_multi = any(isinstance(odds.get(k), dict) for k in ("1x2", "ou25", "ah"))
+        if target_market in ("home", "draw", "away"):
+            if is_multi:
+                odds_1x2 = odds.get("1x2", {})
+                if odds_1x2 and odds_1x2.get("pin_home", 0) > 1.0:
+                    pins[r] = [odds_1x2.get(f"pin_{side}", 0) for side in sides]
+            else:
+                pins[r] = [odds.get(f"{side}_odds", 0) for side in sides]
+        elif is_multi:
+            market = odds.get("ou25" if target_market in ("over25", "under25") else "ah")
+            if market:
+                pins[r] = [market.get(f"pin_{side}", 0) for side in sides]
+
+    valid = (pins > 1.0).all(axis=1)
+    raw = np.divide(1.0, pins, out=np.zeros_like(pins), where=valid[:, None])
+    total = raw[:, 0] + raw[:, 1]
+    if len(sides) == 3:
+        total = total + raw[:, 2]
+    fair = np.divide(raw[:, col], total, out=np.zeros(len(keys)), where=valid)
+    return dict(zip(keys, fair.tolist()))
+
+
+class _WindowDC:
+    """DixonColesModel view serving predictions batch-computed for one refit window.
+
+    DC parameters are fixed until the next refit, so every match of the window
+    is predicted up front with predict_batch; any other pair is predicted by
+    the model once and memoized. A refit builds a new view, which is what
+    invalidates the cache. Everything else is delegated to the fitted model.
+    """
+
+    def __init__(self, model: DixonColesModel, window: list[dict]):
+        self.model = model
+        homes = [m["home_team"] for m in window]
+        aways = [m["away_team"] for m in window]
+        self._preds = dict(zip(zip(homes, aways), model.predict_batch(homes, aways)))
+
+    def predict(self, home_team: str, away_team: str):
+        pred = self._preds.get((home_team, away_team))
+        if pred is None:
+            pred = self._preds[(home_team, away_team)] = self.model.predict(home_team, away_team)
+        return pred
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+@dataclass
+class RawData:
+    """Walk-forward output as columns: one row per match with usable odds.
+
+    prob_* hold the target market probability under each strategy (for O/U
+    and AH markets several strategies share the same values).
+    """
+
+    date: list[str]
+    home: list[str]
+    away: list[str]
+    prob_baseline: np.ndarray
+    prob_xgb: np.ndarray
+    prob_xgb_draw: np.ndarray
+    prob_xgb_cal: np.ndarray
+    fair_prob: np.ndarray
+    best_odds: np.ndarray
+    won: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.won)
+
+
 def collect_raw_data(
     matches: list[dict],
     odds_data: dict,
@@ -48,16 +178,19 @@ def collect_raw_data(
     xgb_retrain_interval: int = 60,
     calibrator_retrain_interval: int = 100,
     kelly_fraction: float = 0.15,
-) -> list[dict]:
+) -> RawData:
     """Run walk-forward and collect raw probabilities for target_market.
 
-    Returns a list of dicts, one per match with odds, containing:
+    Returns a RawData with, per match with odds:
       - prob_baseline, prob_xgb, prob_xgb_draw, prob_xgb_cal
-      - fair_prob, best_odds, outcome (bool: True if target won)
-    For O/U markets: prob_dc_ou, prob_xgb_ou instead of 4 strategies.
+      - fair_prob, best_odds, won (True if target won)
+    For O/U markets: DC and XGB O/U probabilities fill the 4 strategies.
     """
-    matches = sorted(matches, key=lambda m: m["kickoff"])
+    # Sort on int64 nanosecond keys in C rather than comparing Timestamps in Python
+    kickoffs = pd.DatetimeIndex([m["kickoff"] for m in matches]).asi8
+    matches = [matches[j] for j in np.argsort(kickoffs, kind="stable")]
     n = len(matches)
+    fair_table = _fair_prob_table(odds_data, target_market)
 
     # Models
     elo = EloRating()
@@ -66,18 +199,72 @@ def collect_raw_data(
     xgb_model = XGBStackingModel()
     calibrator = ProbabilityCalibrator(method="isotonic")
     xgb_over25 = XGBPropModel(market_name="over25")
+    ens_base = ens_xgb = ens_draw = None
+
+    # DC training set: every match before the current one, grown as matches are played
+    train_matches: list[MatchResult] = []
+
+    def add_dc_match(test: dict, hs: int, aws: int) -> None:
+        train_matches.append(MatchResult(
+            date=test["kickoff"], home_team=test["home_team"], away_team=test["away_team"],
+            home_goals=hs, away_goals=aws,
+        ))
 
-    # Training data for XGB and calibrator
-    X_train, y_train = [], []
-    cal_probs, cal_outcomes = [], []
-    xgb_ou_X, xgb_ou_y = [], []
+    # Training data for XGB and calibrator, preallocated and filled up to n_train
+    # rows. The 1X2 XGB, O/U XGB and calibrator all train on the same rows, so
+    # they share X_train and y_train (outcome: 0=home, 1=draw, 2=away).
+    X_train = np.empty((n, len(FEATURE_NAMES)), dtype=np.float32)
+    y_train = np.empty(n, dtype=np.int8)
+    y_ou = np.empty(n, dtype=np.int8)
+    cal_probs = np.empty((n, 3))
+    n_train = 0
+
+    # Result columns, preallocated for every match and trimmed to k rows at the end
+    out_probs = np.empty((4, n))  # baseline, xgb, xgb_draw, xgb_cal
+    out_fair = np.empty(n)
+    out_odds = np.empty(n)
+    out_won = np.empty(n, dtype=bool)
+    out_date, out_home, out_away = [], [], []
+    k = 0
+
+    def emit(test: dict, date_str: str, probs: tuple, fair_p: float, best_o: float, won: bool) -> None:
+        nonlocal k
+        out_date.append(date_str)
+        out_home.append(test["home_team"])
+        out_away.append(test["away_team"])
+        out_probs[:, k] = probs
+        out_fair[k] = fair_p
+        out_odds[k] = best_o
+        out_won[k] = won
+        k += 1
+
+    def add_training_row(feat_arr: np.ndarray, hs: int, aws: int, probs: tuple) -> None:
+        nonlocal n_train
+        X_train[n_train] = feat_arr
+        y_train[n_train] = 0 if hs > aws else (1 if hs == aws else 2)
+        y_ou[n_train] = hs + aws > 2
+        cal_probs[n_train] = probs
+        n_train += 1
+
+    def feed_models(test: dict, hs: int, aws: int, feat_arr: np.ndarray | None, probs_base: tuple | None) -> None:
+        """Post-match update: ELO, history and, when features exist, the training sets."""
+        elo.update(EloMatch(
+            home_team=test["home_team"], away_team=test["away_team"],
+            home_goals=hs, away_goals=aws,
+        ))
+        history.add_match(test)
+        add_dc_match(test, hs, aws)
+        if feat_arr is not None:
+            add_training_row(feat_arr, hs, aws, probs_base)
 
-    raw_data = []
     current_season = None
 
     for i in range(n):
         test = matches[i]
+        home_team, away_team = test["home_team"], test["away_team"]
+        hs, aws = int(test["home_score"]), int(test["away_score"])
         date_str = str(test["kickoff"])[:10]
+        match_key = f"{home_team}_vs_{away_team}_{date_str}"
 
         # Detect season transitions for ELO decay
         test_season = test.get("season")
@@ -89,135 +276,124 @@ def collect_raw_data(
         if i < min_training:
             # Feed ELO + history
             elo.update(EloMatch(
-                home_team=test["home_team"], away_team=test["away_team"],
-                home_goals=int(test["home_score"]), away_goals=int(test["away_score"]),
+                home_team=home_team, away_team=away_team,
+                home_goals=hs, away_goals=aws,
             ))
             history.add_match(test)
 
             # Fit DC periodically (needs >= 50 matches)
             if i >= 50 and i % refit_interval == 0:
-                train_matches = [MatchResult(
-                    date=m["kickoff"], home_team=m["home_team"], away_team=m["away_team"],
-                    home_goals=int(m["home_score"]), away_goals=int(m["away_score"]),
-                ) for m in matches[:i]]
-                dc = DixonColesModel()
-                dc.fit(train_matches)
+                dc = _WindowDC(DixonColesModel().fit(train_matches), matches[i:i + refit_interval])
+            add_dc_match(test, hs, aws)
 
             # Accumulate XGB training data
             if dc is not None and i >= 80:
                 try:
                     features = compute_features(
-                        test["home_team"], test["away_team"],
+                        home_team, away_team,
                         test["kickoff"], history, dc, elo,
                     )
-                    hs, aws = int(test["home_score"]), int(test["away_score"])
-                    outcome = 0 if hs > aws else (1 if hs == aws else 2)
-                    X_train.append(features_to_array(features))
-                    y_train.append(outcome)
-
-                    # O/U data
-                    total_goals = hs + aws
-                    xgb_ou_X.append(features_to_array(features))
-                    xgb_ou_y.append(1 if total_goals > 2 else 0)
-
-                    # Calibration data
-                    dc_pred = dc.predict(test["home_team"], test["away_team"])
-                    cal_probs.append([dc_pred.home_win, dc_pred.draw, dc_pred.away_win])
-                    cal_outcomes.append(outcome)
+                    # Calibration data uses raw DC probabilities here
+                    dc_pred = dc.predict(home_team, away_team)
+                    add_training_row(
+                        features_to_array(features), hs, aws,
+                        (dc_pred.home_win, dc_pred.draw, dc_pred.away_win),
+                    )
                 except Exception:
                     pass
 
             continue
 
         # --- Periodic refitting ---
-        train_idx = i
+        models_changed = False
         if i == min_training or (i - min_training) % refit_interval == 0:
-            train_matches = [MatchResult(
-                date=m["kickoff"], home_team=m["home_team"], away_team=m["away_team"],
-                home_goals=int(m["home_score"]), away_goals=int(m["away_score"]),
-            ) for m in matches[:train_idx]]
-            dc = DixonColesModel()
-            dc.fit(train_matches)
-
-        if (i == min_training or (i - min_training) % xgb_retrain_interval == 0) and len(X_train) >= 100:
-            X = np.vstack(X_train)
-            y = np.array(y_train)
-            split = max(int(len(X) * 0.8), len(X) - 200)
+            dc = _WindowDC(DixonColesModel().fit(train_matches), matches[i:i + refit_interval])
+            models_changed = True
+
+        if (i == min_training or (i - min_training) % xgb_retrain_interval == 0) and n_train >= 100:
+            X = X_train[:n_train]
+            y = y_train[:n_train]
+            split = max(int(n_train * 0.8), n_train - 200)
             xgb_model = XGBStackingModel()
             xgb_model.fit(X[:split], y[:split], X[split:], y[split:])
+            models_changed = True
 
             # O/U XGB
-            if len(xgb_ou_X) >= 100:
-                X_ou = np.vstack(xgb_ou_X)
-                y_ou = np.array(xgb_ou_y)
-                xgb_over25 = XGBPropModel(market_name="over25")
-                xgb_over25.fit(X_ou[:split], y_ou[:split], X_ou[split:], y_ou[split:])
+            y_o = y_ou[:n_train]
+            xgb_over25 = XGBPropModel(market_name="over25")
+            xgb_over25.fit(X[:split], y_o[:split], X[split:], y_o[split:])
 
-        if (i == min_training or (i - min_training) % calibrator_retrain_interval == 0) and len(cal_probs) >= 80:
+        if (i == min_training or (i - min_training) % calibrator_retrain_interval == 0) and n_train >= 80:
             calibrator = ProbabilityCalibrator(method="isotonic")
-            calibrator.fit(np.array(cal_probs), np.array(cal_outcomes))
+            calibrator.fit(cal_probs[:n_train], y_train[:n_train])
+
+        # Ensembles only hold model references: rebuild them when a model is refit
+        if models_changed and dc is not None:
+            ens_base = EnsemblePredictor(
+                dc_model=dc, elo_model=elo,
+                dc_weight=dc_weight, elo_weight=elo_weight,
+            )
+            ens_xgb = EnsemblePredictor(
+                dc_model=dc, elo_model=elo,
+                dc_weight=dc_weight, elo_weight=elo_weight,
+                xgb_model=xgb_model,
+            )
+            ens_draw = EnsemblePredictor(
+                dc_model=dc, elo_model=elo,
+                dc_weight=dc_weight, elo_weight=elo_weight,
+                xgb_model=xgb_model, xgb_markets={"draw"},
+            )
 
         # --- Compute features for this match ---
         match_features = None
         if dc is not None:
             try:
                 match_features = compute_features(
-                    test["home_team"], test["away_team"],
+                    home_team, away_team,
                     test["kickoff"], history, dc, elo,
                 )
             except Exception:
                 pass
 
+        # Serialized once, shared by the XGB and O/U training sets
+        feat_arr = features_to_array(match_features) if match_features is not None else None
+
         # --- Compute all probability sources ---
         if dc is None:
             # Feed ELO + history and skip
-            elo.update(EloMatch(
-                home_team=test["home_team"], away_team=test["away_team"],
-                home_goals=int(test["home_score"]), away_goals=int(test["away_score"]),
-            ))
-            history.add_match(test)
+            feed_models(test, hs, aws, None, None)
             continue
 
+        # One DC prediction per match, shared by the ensembles and the O/U + AH markets
+        dc_pred = dc.predict(home_team, away_team)
+
         # Baseline: DC + ELO
-        ens_base = EnsemblePredictor(
-            dc_model=dc, elo_model=elo,
-            dc_weight=dc_weight, elo_weight=elo_weight,
-        )
-        pred_base = ens_base.predict(test["home_team"], test["away_team"])
-        probs_base = np.array([pred_base.home_prob, pred_base.draw_prob, pred_base.away_prob])
+        pred_base = ens_base.predict(home_team, away_team, dc_pred=dc_pred)
+        probs_base = (pred_base.home_prob, pred_base.draw_prob, pred_base.away_prob)
 
         # XGB variants
         if xgb_model.is_fitted and match_features is not None:
-            ens_xgb = EnsemblePredictor(
-                dc_model=dc, elo_model=elo,
-                dc_weight=dc_weight, elo_weight=elo_weight,
-                xgb_model=xgb_model,
+            pred_xgb = ens_xgb.predict(
+                home_team, away_team, match_features=match_features, dc_pred=dc_pred,
             )
-            pred_xgb = ens_xgb.predict(test["home_team"], test["away_team"], match_features=match_features)
-            probs_xgb = np.array([pred_xgb.home_prob, pred_xgb.draw_prob, pred_xgb.away_prob])
+            probs_xgb = (pred_xgb.home_prob, pred_xgb.draw_prob, pred_xgb.away_prob)
 
-            ens_draw = EnsemblePredictor(
-                dc_model=dc, elo_model=elo,
-                dc_weight=dc_weight, elo_weight=elo_weight,
-                xgb_model=xgb_model, xgb_markets={"draw"},
+            pred_draw = ens_draw.predict(
+                home_team, away_team, match_features=match_features, dc_pred=dc_pred,
             )
-            pred_draw = ens_draw.predict(test["home_team"], test["away_team"], match_features=match_features)
-            probs_xgb_draw = np.array([pred_draw.home_prob, pred_draw.draw_prob, pred_draw.away_prob])
+            probs_xgb_draw = (pred_draw.home_prob, pred_draw.draw_prob, pred_draw.away_prob)
 
-            # Calibrated XGB
+            # Calibrated XGB (the calibrator is the only consumer that needs an ndarray)
             if calibrator.is_fitted:
-                raw = np.array([pred_xgb.home_prob, pred_xgb.draw_prob, pred_xgb.away_prob])
-                cal_p = calibrator.calibrate(raw)
-                probs_cal = cal_p / cal_p.sum() if cal_p.sum() > 0 else raw
+                cal_p = calibrator.calibrate(np.array(probs_xgb))
+                cal_sum = cal_p.sum()
+                probs_cal = cal_p / cal_sum if cal_sum > 0 else probs_xgb
             else:
-                probs_cal = probs_xgb.copy()
+                probs_cal = probs_xgb
         else:
-            probs_xgb = probs_base.copy()
-            probs_xgb_draw = probs_base.copy()
-            probs_cal = probs_base.copy()
+            probs_xgb = probs_xgb_draw = probs_cal = probs_base
 
-        # DC prediction for O/U
-        dc_pred = dc.predict(test["home_team"], test["away_team"])
+        # O/U probabilities
         dc_over25_p = dc_pred.over_25 if dc_pred is not None else None
         xgb_over25_p = None
         if xgb_over25.is_fitted and match_features is not None:
@@ -228,49 +404,24 @@ def collect_raw_data(
         ah_away_p = None
         ah_line = None
         if dc_pred is not None and dc_pred.score_matrix is not None:
-            match_key = f"{test['home_team']}_vs_{test['away_team']}_{date_str}"
             odds = odds_data.get(match_key, {})
             is_multi = any(isinstance(odds.get(k), dict) for k in ("1x2", "ou25", "ah"))
             odds_ah = odds.get("ah") if is_multi else None
             if odds_ah:
                 ah_line = odds_ah.get("line", 0)
-                matrix = dc_pred.score_matrix
-                n_goals = matrix.shape[0]
-                ah_home_p = 0.0
-                for gi in range(n_goals):
-                    for gj in range(n_goals):
-                        if gi + ah_line > gj:
-                            ah_home_p += float(matrix[gi, gj])
+                ah_home_p = _ah_cover_prob(dc_pred.score_matrix, ah_line)
                 ah_away_p = 1.0 - ah_home_p
 
         # --- Get odds ---
-        match_key = f"{test['home_team']}_vs_{test['away_team']}_{date_str}"
         if match_key not in odds_data:
             # Still feed models
-            elo.update(EloMatch(
-                home_team=test["home_team"], away_team=test["away_team"],
-                home_goals=int(test["home_score"]), away_goals=int(test["away_score"]),
-            ))
-            history.add_match(test)
-            # Accumulate training data
-            if match_features is not None:
-                hs, aws = int(test["home_score"]), int(test["away_score"])
-                outcome = 0 if hs > aws else (1 if hs == aws else 2)
-                X_train.append(features_to_array(match_features))
-                y_train.append(outcome)
-                total_goals = hs + aws
-                xgb_ou_X.append(features_to_array(match_features))
-                xgb_ou_y.append(1 if total_goals > 2 else 0)
-                cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-                cal_outcomes.append(outcome)
+            feed_models(test, hs, aws, feat_arr, probs_base)
             continue
 
         odds = odds_data[match_key]
         is_multi = any(isinstance(odds.get(k), dict) for k in ("1x2", "ou25", "ah"))
 
         # Actual result
-        hs = int(test["home_score"])
-        aws = int(test["away_score"])
         outcome = 0 if hs > aws else (1 if hs == aws else 2)
         total_goals = hs + aws
 
@@ -284,99 +435,52 @@ def collect_raw_data(
             has_1x2 = odds_1x2 and odds_1x2.get("pin_home", 0) > 1.0
 
             if has_1x2:
-                fair = remove_margin(
-                    odds_1x2.get("pin_home", 0), odds_1x2.get("pin_draw", 0), odds_1x2.get("pin_away", 0)
-                )
                 best_odds_map = {
                     "home": odds_1x2.get("best_home", odds_1x2.get("pin_home", 0)),
                     "draw": odds_1x2.get("best_draw", odds_1x2.get("pin_draw", 0)),
                     "away": odds_1x2.get("best_away", odds_1x2.get("pin_away", 0)),
                 }
             elif not is_multi:
-                fair = remove_margin(
-                    odds.get("home_odds", 0), odds.get("draw_odds", 0), odds.get("away_odds", 0)
-                )
                 best_odds_map = {
                     "home": odds.get("best_home", odds.get("home_odds", 0)),
                     "draw": odds.get("best_draw", odds.get("draw_odds", 0)),
                     "away": odds.get("best_away", odds.get("away_odds", 0)),
                 }
             else:
-                fair = {"home": 0, "draw": 0, "away": 0}
                 best_odds_map = {"home": 0, "draw": 0, "away": 0}
 
-            fair_p = fair[target_market]
+            fair_p = fair_table[match_key]
             best_o = best_odds_map[target_market]
 
             if fair_p <= 0 or best_o <= 1.0:
-                elo.update(EloMatch(
-                    home_team=test["home_team"], away_team=test["away_team"],
-                    home_goals=hs, away_goals=aws,
-                ))
-                history.add_match(test)
-                if match_features is not None:
-                    X_train.append(features_to_array(match_features))
-                    y_train.append(outcome)
-                    xgb_ou_X.append(features_to_array(match_features))
-                    xgb_ou_y.append(1 if total_goals > 2 else 0)
-                    cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-                    cal_outcomes.append(outcome)
+                feed_models(test, hs, aws, feat_arr, probs_base)
                 continue
 
-            raw_data.append({
-                "date": date_str,
-                "home": test["home_team"],
-                "away": test["away_team"],
-                "prob_baseline": float(probs_base[market_idx]),
-                "prob_xgb": float(probs_xgb[market_idx]),
-                "prob_xgb_draw": float(probs_xgb_draw[market_idx]),
-                "prob_xgb_cal": float(probs_cal[market_idx]),
-                "fair_prob": float(fair_p),
-                "best_odds": float(best_o),
-                "won": won,
-            })
+            emit(
+                test, date_str,
+                (probs_base[market_idx], probs_xgb[market_idx],
+                 probs_xgb_draw[market_idx], probs_cal[market_idx]),
+                fair_p, best_o, won,
+            )
 
         elif target_market in ("over25", "under25"):
             odds_ou = odds.get("ou25") if is_multi else None
             if not odds_ou:
-                elo.update(EloMatch(
-                    home_team=test["home_team"], away_team=test["away_team"],
-                    home_goals=hs, away_goals=aws,
-                ))
-                history.add_match(test)
-                if match_features is not None:
-                    X_train.append(features_to_array(match_features))
-                    y_train.append(outcome)
-                    xgb_ou_X.append(features_to_array(match_features))
-                    xgb_ou_y.append(1 if total_goals > 2 else 0)
-                    cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-                    cal_outcomes.append(outcome)
+                feed_models(test, hs, aws, feat_arr, probs_base)
                 continue
 
             pin_over = odds_ou.get("pin_over", 0)
             pin_under = odds_ou.get("pin_under", 0)
             if pin_over <= 1.0 or pin_under <= 1.0:
-                elo.update(EloMatch(
-                    home_team=test["home_team"], away_team=test["away_team"],
-                    home_goals=hs, away_goals=aws,
-                ))
-                history.add_match(test)
-                if match_features is not None:
-                    X_train.append(features_to_array(match_features))
-                    y_train.append(outcome)
-                    xgb_ou_X.append(features_to_array(match_features))
-                    xgb_ou_y.append(1 if total_goals > 2 else 0)
-                    cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-                    cal_outcomes.append(outcome)
+                feed_models(test, hs, aws, feat_arr, probs_base)
                 continue
 
-            fair_over_p, fair_under_p = remove_margin_2way(pin_over, pin_under)
             best_over = odds_ou.get("best_over", pin_over)
             best_under = odds_ou.get("best_under", pin_under)
 
             is_over = target_market == "over25"
             won = total_goals > 2 if is_over else total_goals < 3
-            fair_p = fair_over_p if is_over else fair_under_p
+            fair_p = fair_table[match_key]
             best_o = best_over if is_over else best_under
 
             dc_p = dc_over25_p if dc_over25_p is not None else 0.5
@@ -386,60 +490,27 @@ def collect_raw_data(
                 dc_p = 1.0 - dc_p
                 xgb_p = 1.0 - xgb_p
 
-            raw_data.append({
-                "date": date_str,
-                "home": test["home_team"],
-                "away": test["away_team"],
-                "prob_baseline": float(dc_p),
-                "prob_xgb": float(xgb_p),
-                "prob_xgb_draw": float(dc_p),  # same as baseline for O/U
-                "prob_xgb_cal": float(xgb_p),  # same as xgb for O/U
-                "fair_prob": float(fair_p),
-                "best_odds": float(best_o),
-                "won": won,
-            })
+            # xgb_draw same as baseline, xgb_cal same as xgb for O/U
+            emit(test, date_str, (dc_p, xgb_p, dc_p, xgb_p), fair_p, best_o, won)
 
         elif target_market in ("ah_home", "ah_away"):
             odds_ah_data = odds.get("ah") if is_multi else None
             if not odds_ah_data or ah_home_p is None:
-                elo.update(EloMatch(
-                    home_team=test["home_team"], away_team=test["away_team"],
-                    home_goals=hs, away_goals=aws,
-                ))
-                history.add_match(test)
-                if match_features is not None:
-                    X_train.append(features_to_array(match_features))
-                    y_train.append(outcome)
-                    xgb_ou_X.append(features_to_array(match_features))
-                    xgb_ou_y.append(1 if total_goals > 2 else 0)
-                    cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-                    cal_outcomes.append(outcome)
+                feed_models(test, hs, aws, feat_arr, probs_base)
                 continue
 
             pin_ah_home = odds_ah_data.get("pin_home", 0)
             pin_ah_away = odds_ah_data.get("pin_away", 0)
             if pin_ah_home <= 1.0 or pin_ah_away <= 1.0:
-                elo.update(EloMatch(
-                    home_team=test["home_team"], away_team=test["away_team"],
-                    home_goals=hs, away_goals=aws,
-                ))
-                history.add_match(test)
-                if match_features is not None:
-                    X_train.append(features_to_array(match_features))
-                    y_train.append(outcome)
-                    xgb_ou_X.append(features_to_array(match_features))
-                    xgb_ou_y.append(1 if total_goals > 2 else 0)
-                    cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-                    cal_outcomes.append(outcome)
+                feed_models(test, hs, aws, feat_arr, probs_base)
                 continue
 
-            fair_ah_home_p, fair_ah_away_p = remove_margin_2way(pin_ah_home, pin_ah_away)
             best_ah_home = odds_ah_data.get("best_home", pin_ah_home)
             best_ah_away = odds_ah_data.get("best_away", pin_ah_away)
 
             is_home_ah = target_market == "ah_home"
             model_p = ah_home_p if is_home_ah else ah_away_p
-            fair_p = fair_ah_home_p if is_home_ah else fair_ah_away_p
+            fair_p = fair_table[match_key]
             best_o = best_ah_home if is_home_ah else best_ah_away
 
             # AH actual result
@@ -451,43 +522,74 @@ def collect_raw_data(
                 won = aws > adj_home
 
             # AH: only DC Poisson (no XGB variant), all strategies use same prob
-            raw_data.append({
-                "date": date_str,
-                "home": test["home_team"],
-                "away": test["away_team"],
-                "prob_baseline": float(model_p),
-                "prob_xgb": float(model_p),
-                "prob_xgb_draw": float(model_p),
-                "prob_xgb_cal": float(model_p),
-                "fair_prob": float(fair_p),
-                "best_odds": float(best_o),
-                "won": won,
-            })
+            emit(test, date_str, (model_p,) * 4, fair_p, best_o, won)
 
         # --- Post-match: update models ---
-        elo.update(EloMatch(
-            home_team=test["home_team"], away_team=test["away_team"],
-            home_goals=hs, away_goals=aws,
-        ))
-        history.add_match(test)
-
-        if match_features is not None:
-            X_train.append(features_to_array(match_features))
-            y_train.append(outcome)
-            xgb_ou_X.append(features_to_array(match_features))
-            xgb_ou_y.append(1 if total_goals > 2 else 0)
-            cal_probs.append([probs_base[0], probs_base[1], probs_base[2]])
-            cal_outcomes.append(outcome)
-
-    return raw_data
+        feed_models(test, hs, aws, feat_arr, probs_base)
+
+    return RawData(
+        date=out_date,
+        home=out_home,
+        away=out_away,
+        prob_baseline=out_probs[0, :k],
+        prob_xgb=out_probs[1, :k],
+        prob_xgb_draw=out_probs[2, :k],
+        prob_xgb_cal=out_probs[3, :k],
+        fair_prob=out_fair[:k],
+        best_odds=out_odds[:k],
+        won=out_won[:k],
+    )
 
 
 # ---------------------------------------------------------------------------
 # Grid search (post-processing, instantaneous)
 # ---------------------------------------------------------------------------
 
+@njit(cache=True)
+def _bet_stats_kernel(model_probs, fair_probs, best_odds, won, kelly_fraction):
+    """Compiled single sweep for _bet_stats: no intermediate arrays."""
+    n_strategies, n = model_probs.shape
+    edges = np.empty((n_strategies, n))
+    kelly_pct = np.empty((n_strategies, n))
+    pnl_per_bet = np.empty(n)
+    for j in range(n):
+        fp = fair_probs[j]
+        b = best_odds[j] - 1.0
+        pnl_per_bet[j] = b if won[j] else -1.0
+        for s in range(n_strategies):
+            mp = model_probs[s, j]
+            edges[s, j] = (mp - fp) / fp * 100 if fp > 0 else 0.0
+            kelly_pct[s, j] = max(0.0, (b * mp - (1.0 - mp)) / b * kelly_fraction * 100) if b > 0 else 0.0
+    return edges, kelly_pct, pnl_per_bet
+
+
+def _bet_stats(
+    model_probs: np.ndarray,
+    fair_probs: np.ndarray,
+    best_odds: np.ndarray,
+    won: np.ndarray,
+    kelly_fraction: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-bet edge (%), Kelly stake (%) and PnL for (S × N) strategy probabilities."""
+    if HAVE_NUMBA:
+        return _bet_stats_kernel(model_probs, fair_probs, best_odds, won, float(kelly_fraction))
+
+    # Edge = (model - fair) / fair * 100
+    edges = np.where(fair_probs > 0, (model_probs - fair_probs) / fair_probs * 100, 0)
+
+    # Kelly stakes
+    b = best_odds - 1.0
+    q = 1.0 - model_probs
+    kelly_raw = np.where(b > 0, (b * model_probs - q) / b, 0)
+    kelly_pct = np.maximum(0, kelly_raw * kelly_fraction * 100)
+
+    # PnL per bet (if placed)
+    pnl_per_bet = np.where(won, best_odds - 1.0, -1.0)
+    return edges, kelly_pct, pnl_per_bet
+
+
 def grid_search(
-    raw_data: list[dict],
+    raw_data: RawData,
     kelly_fraction: float = 0.15,
     min_kelly: float = 1.0,
 ) -> list[dict]:
@@ -497,57 +599,59 @@ def grid_search(
     edge_range = np.arange(3.0, 21.0, 1.0)      # 3% to 20%
     prob_range = np.arange(0.25, 0.75, 0.05)     # 0.25 to 0.70
 
+    # Strategies are independent: stack them as a leading (S × N) axis and
+    # evaluate every grid in one batched pass instead of looping in Python
+    model_probs = np.stack([getattr(raw_data, f"prob_{strategy}") for strategy in strategies])
+    fair_probs = raw_data.fair_prob
+    best_odds = raw_data.best_odds
+    won = raw_data.won
+    edges, kelly_pct, pnl_per_bet = _bet_stats(model_probs, fair_probs, best_odds, won, kelly_fraction)
+
+    # Every (edge_threshold, min_prob) cell at once. Each bet is binned by how
+    # many thresholds it clears on each axis; a histogram over (strategy ×
+    # edge bin × prob bin) followed by a suffix sum along both axes gives every
+    # cell's total over bets with edge >= threshold and prob >= min_prob.
+    # O(N + grid) instead of one reduction over N per cell.
+    n_strategies, n_edges, n_probs = len(strategies), len(edge_range), len(prob_range)
+    edge_bin = np.searchsorted(edge_range, edges, side="right")
+    edge_bin[kelly_pct < min_kelly] = 0  # below min Kelly: never bet
+    prob_bin = np.searchsorted(prob_range, model_probs, side="right")
+    strategy_idx = np.arange(n_strategies)[:, None]
+    cell = ((strategy_idx * (n_edges + 1) + edge_bin) * (n_probs + 1) + prob_bin).ravel()
+    hist_shape = (n_strategies, n_edges + 1, n_probs + 1)
+
+    def suffix_grid(cells: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+        hist = np.bincount(cells, weights=weights, minlength=np.prod(hist_shape)).reshape(hist_shape)
+        return hist[:, ::-1, ::-1].cumsum(axis=1).cumsum(axis=2)[:, -2::-1, -2::-1]
+
+    n_bets_grid = suffix_grid(cell)
+    wins_grid = suffix_grid(cell[np.tile(won, n_strategies)])
+    pnl_grid = suffix_grid(cell, np.tile(pnl_per_bet, n_strategies))
+    edge_sum_grid = suffix_grid(cell, edges.ravel())
+    odds_sum_grid = suffix_grid(cell, np.tile(best_odds, n_strategies))
+
+    # Pull the surviving cells out as Python scalars in one go
+    valid = n_bets_grid >= 5
+    edge_values = edge_range.tolist()
+    prob_values = prob_range.tolist()
     results = []
-
-    for strategy in strategies:
-        prob_key = f"prob_{strategy}"
-
-        # Pre-extract arrays for speed
-        model_probs = np.array([d[prob_key] for d in raw_data])
-        fair_probs = np.array([d["fair_prob"] for d in raw_data])
-        best_odds = np.array([d["best_odds"] for d in raw_data])
-        won = np.array([d["won"] for d in raw_data])
-
-        # Edge = (model - fair) / fair * 100
-        edges = np.where(fair_probs > 0, (model_probs - fair_probs) / fair_probs * 100, 0)
-
-        # Kelly stakes
-        b = best_odds - 1.0
-        q = 1.0 - model_probs
-        kelly_raw = np.where(b > 0, (b * model_probs - q) / b, 0)
-        kelly_pct = np.maximum(0, kelly_raw * kelly_fraction * 100)
-
-        # PnL per bet (if placed)
-        pnl_per_bet = np.where(won, best_odds - 1.0, -1.0)
-
-        for edge_threshold in edge_range:
-            for min_prob in prob_range:
-                # Filter: edge >= threshold AND prob >= min_prob AND kelly >= min_kelly
-                mask = (edges >= edge_threshold) & (model_probs >= min_prob) & (kelly_pct >= min_kelly)
-                n_bets = mask.sum()
-
-                if n_bets < 5:
-                    continue
-
-                total_pnl = pnl_per_bet[mask].sum()
-                wins = won[mask].sum()
-                win_rate = wins / n_bets
-                roi = total_pnl / n_bets
-                avg_edge = edges[mask].mean()
-                avg_odds = best_odds[mask].mean()
-
-                results.append({
-                    "strategy": strategy,
-                    "edge_threshold": round(float(edge_threshold), 1),
-                    "min_prob": round(float(min_prob), 2),
-                    "n_bets": int(n_bets),
-                    "wins": int(wins),
-                    "win_rate": round(float(win_rate), 4),
-                    "total_pnl": round(float(total_pnl), 2),
-                    "roi": round(float(roi), 4),
-                    "avg_edge": round(float(avg_edge), 1),
-                    "avg_odds": round(float(avg_odds), 2),
-                })
+    for s, e, p, n_bets, wins, total_pnl, edge_sum, odds_sum in zip(
+        *(idx.tolist() for idx in np.nonzero(valid)),
+        n_bets_grid[valid].tolist(), wins_grid[valid].tolist(), pnl_grid[valid].tolist(),
+        edge_sum_grid[valid].tolist(), odds_sum_grid[valid].tolist(),
+    ):
+        results.append({
+            "strategy": strategies[s],
+            "edge_threshold": round(edge_values[e], 1),
+            "min_prob": round(prob_values[p], 2),
+            "n_bets": n_bets,
+            "wins": wins,
+            "win_rate": round(wins / n_bets, 4),
+            "total_pnl": round(total_pnl, 2),
+            "roi": round(total_pnl / n_bets, 4),
+            "avg_edge": round(edge_sum / n_bets, 1),
+            "avg_odds": round(odds_sum / n_bets, 2),
+        })
 
     return results
 
@@ -6,15 +6,22 @@ Usage:
   python scripts/sync_history.py --seed      # First time: load all history.json
   python scripts/sync_history.py --update    # Re-run fetch_results then sync new/changed rows
 
+Talks to PostgREST (Supabase REST API) directly over one pooled requests.Session.
+
 Requires env vars (in .env at project root):
   SUPABASE_URL
   SUPABASE_SERVICE_ROLE_KEY
 """
 
 import argparse
+import gzip
 import json
 import os
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # Add project root to path
@@ -26,11 +33,74 @@ try:
 except ImportError:
     load_dotenv = None
 
-from supabase import create_client
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BATCH_SIZE = 1000
+MAX_WORKERS = 8  # concurrent upserts; merge-duplicates makes their order irrelevant
+
+
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    """Compact JSON request body (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+# Set by any upsert thread that finds the server cannot decode compressed
+# bodies (thread-safe, and setting it twice is harmless); bodies go plain after
+_plain_bodies = threading.Event()
+
 
+def _gzip_refused(r: requests.Response) -> bool:
+    """Whether a request failed because the server could not decode its gzip body.
 
-def get_supabase():
-    """Create Supabase client with service_role key."""
+    PostgREST also answers 400 for bad rows or constraint violations; only a
+    415, or a 400 saying the body was unreadable (PGRST102: our JSON is always
+    valid, so it was read still compressed) or naming the encoding, counts.
+    """
+    if r.status_code == 415:
+        return True
+    if r.status_code != 400:
+        return False
+    text = r.text.lower()
+    return "pgrst102" in text or "gzip" in text or "content-encoding" in text
+
+
+def _post(session: requests.Session, endpoint: str, body: bytes, headers: dict, params=None):
+    """POST a JSON body gzip-compressed, resending it plain if the server cannot decode gzip.
+
+    Responses are already compressed: requests sends Accept-Encoding: gzip.
+    """
+    if not _plain_bodies.is_set():
+        r = session.post(
+            endpoint, params=params, data=gzip.compress(body, compresslevel=1),
+            headers={**headers, "Content-Encoding": "gzip"},
+        )
+        if not _gzip_refused(r):
+            return r
+        _plain_bodies.set()
+    return session.post(endpoint, params=params, data=body, headers=headers)
+
+
+@lru_cache(maxsize=None)
+def get_supabase_config():
+    """Load Supabase URL and service_role key from .env (read once per process)."""
     if load_dotenv:
         load_dotenv(ROOT / ".env")
 
@@ -45,52 +115,124 @@ def get_supabase():
         print("Get it from: Supabase Dashboard > Settings > API > service_role")
         sys.exit(1)
 
-    return create_client(url, key)
+    return url, key
+
+
+def get_session(key: str) -> requests.Session:
+    """Pooled HTTP session carrying the service_role auth headers.
 
+    One session for the whole run keeps the TLS connection alive across
+    batches; transient gateway errors are retried with backoff.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+        allowed_methods=None,  # upserts with merge-duplicates are idempotent
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"apikey": key, "Authorization": f"Bearer {key}"})
+    return session
 
-def load_history():
-    """Load history.json from web/public/."""
+
+def iter_history():
+    """Yield the records of history.json (web/public/) one at a time.
+
+    With ijson installed the file is stream-parsed, so only the batches in
+    flight are ever held in memory; otherwise it is parsed in one go.
+    """
     path = ROOT / "web" / "public" / "history.json"
     if not path.exists():
         print(f"ERROR: {path} not found")
         sys.exit(1)
-    with open(path) as f:
-        return json.load(f)
+    if ijson is None:
+        yield from _loads(path.read_bytes())
+        return
+    with open(path, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
 
 
-def seed(supabase):
+def seed(session: requests.Session, url: str):
     """Seed all records from history.json into Supabase."""
-    records = load_history()
-    print(f"Loaded {len(records)} records from history.json")
+    # Upsert straight to PostgREST, several batches in flight on the shared
+    # session. `columns` lists every key in the batch so rows with missing
+    # fields are accepted (as NULL).
+    headers = {
+        "Content-Type": "application/json",
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+
+    # Batches run concurrently, so an id must appear in only one of them (and
+    # only once: Postgres rejects a row hit twice by one upsert). Later rows
+    # for an id already queued are held back and sent last, so the last
+    # row in the file still wins.
+    seen: set[str] = set()
+    repeats: dict[str, dict] = {}
+
+    def batches():
+        batch = []
+        for r in iter_history():
+            if r["id"] in seen:
+                repeats[r["id"]] = r
+                continue
+            seen.add(r["id"])
+            batch.append(r)
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
-    # Convert date fields to string for Supabase
-    for r in records:
-        if r.get("date"):
-            r["date"] = str(r["date"])
+    def upsert(batch):
+        params = {"columns": ",".join(f'"{k}"' for k in sorted({k for r in batch for k in r}))}
+        body = _dumps(batch)
+        r = _post(session, f"{url}/rest/v1/bets", body, headers, params)
+        if r.status_code not in (200, 201):  # one more try before giving up
+            r = _post(session, f"{url}/rest/v1/bets", body, headers, params)
+        return r
 
-    # Upsert in batches of 500
-    batch_size = 500
     total = 0
-    for i in range(0, len(records), batch_size):
-        batch = records[i : i + batch_size]
-        supabase.table("bets").upsert(batch).execute()
-        total += len(batch)
-        print(f"  Upserted {total}/{len(records)}")
 
-    print(f"Done. {len(records)} records in Supabase.")
+    def report(n_rows, r):
+        nonlocal total
+        if r.status_code not in (200, 201):
+            print(f"  FAILED batch: {r.status_code} {r.text[:200]}")
+            sys.exit(1)
+        total += n_rows
+        print(f"  Upserted {total}")
+
+    # Keep at most MAX_WORKERS batches queued beyond the ones being sent
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        in_flight = deque()
+        for batch in batches():
+            in_flight.append((len(batch), pool.submit(upsert, batch)))
+            if len(in_flight) >= 2 * MAX_WORKERS:
+                n_rows, future = in_flight.popleft()
+                report(n_rows, future.result())
+        for n_rows, future in in_flight:
+            report(n_rows, future.result())
+
+    if repeats:
+        report(0, upsert(list(repeats.values())))
+
+    print(f"Done. {total} records in Supabase.")
 
 
-def update(supabase):
+def update(session: requests.Session, url: str):
     """Fetch latest results and sync to Supabase."""
-    # Re-run fetch_results.py first
-    fetch_script = ROOT / "scripts" / "fetch_results.py"
-    if fetch_script.exists():
-        print("Running fetch_results.py...")
-        os.system(f"python3 {fetch_script}")
-        print()
+    # Re-run fetch_results first, in-process: no interpreter start-up or
+    # re-imports. As with the old shell-out, a failure does not stop the sync.
+    print("Running fetch_results.py...")
+    try:
+        from scripts import fetch_results
+        fetch_results.main()
+    except Exception as e:
+        print(f"WARNING: fetch_results failed: {e}")
+    print()
 
     # Now sync the updated history.json
-    seed(supabase)
+    seed(session, url)
 
 
 def main():
@@ -103,12 +245,13 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    sb = get_supabase()
+    url, key = get_supabase_config()
+    session = get_session(key)
 
     if args.seed:
-        seed(sb)
+        seed(session, url)
     elif args.update:
-        update(sb)
+        update(session, url)
 
 
 if __name__ == "__main__":
@@ -10,9 +10,12 @@ Usage:
     python scripts/sync_predictions.py
 """
 
+import asyncio
+import gzip
 import json
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent.parent
@@ -23,13 +26,100 @@ try:
 except ImportError:
     load_dotenv = None
 
-import requests
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import h2  # noqa: F401  (lets httpx speak HTTP/2)
+except ImportError:
+    h2 = None
+
+import httpx
 
 PREDICTIONS_FILE = ROOT / "web" / "public" / "predictions.json"
+BATCH_SIZE = 1000
+MAX_WORKERS = 8  # concurrent upserts/deletes; merge-duplicates makes their order irrelevant
+RETRY_STATUSES = (502, 503, 504)
+UPSERT_HEADERS = {
+    "Content-Type": "application/json",
+    "Prefer": "resolution=merge-duplicates,return=minimal",
+}
+DELETE_HEADERS = {"Prefer": "return=minimal"}
+COUNTED_DELETE_HEADERS = {"Prefer": "return=minimal,count=exact"}
+MAX_FILTER_CHARS = 6000  # id filter length that keeps request URLs under ~8 KB
+_EMPTY: dict = {}  # shared read-only default for missing sub-dicts
+
+
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    """Compact JSON request body (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+_gzip_bodies = True  # switched off for the run if the server cannot decode compressed bodies
+
+
+def _gzip_refused(r: httpx.Response) -> bool:
+    """Whether a request failed because the server could not decode its gzip body.
+
+    PostgREST also answers 400 for bad rows or constraint violations; only a
+    415, or a 400 saying the body was unreadable (PGRST102: our JSON is always
+    valid, so it was read still compressed) or naming the encoding, counts.
+    """
+    if r.status_code == 415:
+        return True
+    if r.status_code != 400:
+        return False
+    text = r.text.lower()
+    return "pgrst102" in text or "gzip" in text or "content-encoding" in text
+
+
+async def _send(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, method: str, endpoint: str, **kwargs,
+) -> httpx.Response:
+    """Send one request under the concurrency cap, retrying transient gateway errors.
+
+    Upserts with merge-duplicates and id-filtered deletes are idempotent.
+    """
+    async with sem:
+        for attempt in range(3):
+            r = await client.request(method, endpoint, **kwargs)
+            if r.status_code not in RETRY_STATUSES:
+                break
+            await asyncio.sleep(0.2 * 2**attempt)
+        return r
+
+
+async def _post(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, endpoint: str, body: bytes, headers: dict,
+) -> httpx.Response:
+    """POST a JSON body gzip-compressed, resending it plain if the server cannot decode gzip.
+
+    Responses are already compressed: httpx sends Accept-Encoding: gzip.
+    """
+    global _gzip_bodies
+    if _gzip_bodies:
+        r = await _send(
+            client, sem, "POST", endpoint, content=gzip.compress(body, compresslevel=1),
+            headers={**headers, "Content-Encoding": "gzip"},
+        )
+        if not _gzip_refused(r):
+            return r
+        # Tasks share one thread and nothing awaits before this write: no lock needed
+        _gzip_bodies = False
+    return await _send(client, sem, "POST", endpoint, content=body, headers=headers)
 
 
+@lru_cache(maxsize=None)
 def get_supabase_config():
-    """Load Supabase URL and service_role key from .env."""
+    """Load Supabase URL and service_role key from .env (read once per process)."""
     if load_dotenv:
         load_dotenv(ROOT / ".env")
 
@@ -46,14 +136,31 @@ def get_supabase_config():
     return url, key
 
 
+def get_client(key: str) -> httpx.AsyncClient:
+    """Async HTTP client carrying the service_role auth headers.
+
+    All requests share one connection pool; with h2 installed they are
+    multiplexed over a single HTTP/2 connection.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        http2=h2 is not None,
+        limits=httpx.Limits(max_connections=MAX_WORKERS),
+        retries=3,  # connection failures only; bad statuses are retried in _send
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=30,
+        headers={"apikey": key, "Authorization": f"Bearer {key}"},
+    )
+
+
 def load_predictions():
     """Load predictions from predictions.json."""
     if not PREDICTIONS_FILE.exists():
         print(f"ERROR: {PREDICTIONS_FILE} not found")
         sys.exit(1)
 
-    with open(PREDICTIONS_FILE, encoding="utf-8") as f:
-        raw = json.load(f)
+    raw = _loads(PREDICTIONS_FILE.read_bytes())
 
     if isinstance(raw, dict):
         return raw.get("predictions", [])
@@ -67,23 +174,20 @@ def prediction_to_bet(pred: dict) -> dict | None:
         return None
 
     kickoff = pred.get("kickoff", "")
-    best_odds = pred.get("best_odds", {})
-    model_probs = pred.get("model_probs", {})
-    edges = pred.get("edge", {})
 
     # For secondary markets (over25, under25, etc.), get prob from the right field
-    prob = model_probs.get(recommended_bet)
+    prob = pred.get("model_probs", _EMPTY).get(recommended_bet)
     if prob is None:
         # Try over_under dict
-        ou = pred.get("over_under", {})
-        prob = ou.get(recommended_bet)
+        prob = pred.get("over_under", _EMPTY).get(recommended_bet)
 
-    edge = edges.get(recommended_bet)
+    edge = pred.get("edge", _EMPTY).get(recommended_bet)
     if edge is not None:
         # Convert from decimal to percentage if needed
-        edge = round(float(edge) * 100, 1) if abs(float(edge)) < 1 else round(float(edge), 1)
+        edge = float(edge)
+        edge = round(edge * 100 if abs(edge) < 1 else edge, 1)
 
-    odds = best_odds.get(recommended_bet)
+    odds = pred.get("best_odds", _EMPTY).get(recommended_bet)
 
     return {
         "id": pred.get("match_id", ""),
@@ -101,7 +205,10 @@ def prediction_to_bet(pred: dict) -> dict | None:
     }
 
 
-def delete_stale_pending(url: str, headers: dict, current_ids: set[str], dates: set[str]):
+async def delete_stale_pending(
+    client: httpx.AsyncClient, sem: asyncio.Semaphore, bets_url: str,
+    current_ids: set[str], dates: set[str],
+):
     """Delete unresolved bets for the given dates that are NOT in current_ids.
 
     This cleans up stale predictions from previous pipeline runs (e.g. removed
@@ -110,68 +217,74 @@ def delete_stale_pending(url: str, headers: dict, current_ids: set[str], dates:
     if not dates:
         return
 
-    # Fetch all unresolved bets for the relevant dates
-    date_list = ",".join(f'"{d}"' for d in sorted(dates))
-    fetch_headers = {
-        "apikey": headers["apikey"],
-        "Authorization": headers["Authorization"],
+    filters = {
+        "resolved": "eq.false",
+        "date": f"in.({','.join(sorted(dates))})",
     }
-    r = requests.get(
-        f"{url}/rest/v1/bets",
-        headers=fetch_headers,
-        params={
-            "resolved": "eq.false",
-            "date": f"in.({','.join(sorted(dates))})",
-            "select": "id",
-        },
-    )
+
+    # Usually the current ids fit in the URL: then a single DELETE with a
+    # not.in filter lets the database pick the stale rows itself
+    id_list = ",".join(f'"{i}"' for i in sorted(current_ids))
+    if len(id_list) <= MAX_FILTER_CHARS:
+        if current_ids:
+            filters["id"] = f"not.in.({id_list})"
+        dr = await _send(
+            client, sem, "DELETE", bets_url, headers=COUNTED_DELETE_HEADERS, params=filters,
+        )
+        if dr.status_code not in (200, 204):
+            print(f"  WARNING: Delete failed: {dr.status_code} {dr.text[:200]}")
+            return
+        n_deleted = dr.headers.get("Content-Range", "").rpartition("/")[2]
+        if n_deleted not in ("", "0", "*"):
+            print(f"  Cleaned up {n_deleted} stale unresolved bet(s)")
+        return
+
+    # Otherwise fetch all unresolved bets for the relevant dates and diff here
+    r = await _send(client, sem, "GET", bets_url, params={**filters, "select": "id"})
     if r.status_code != 200:
         print(f"  WARNING: Could not fetch stale bets: {r.status_code}")
         return
 
-    existing = r.json()
+    existing = _loads(r.content)
     stale_ids = [row["id"] for row in existing if row["id"] not in current_ids]
 
     if not stale_ids:
         return
 
-    # Delete stale bets in batches
+    # Delete stale bets in batches, several in flight at once
     print(f"  Cleaning up {len(stale_ids)} stale unresolved bet(s)...")
-    del_headers = {
-        "apikey": headers["apikey"],
-        "Authorization": headers["Authorization"],
-        "Prefer": "return=minimal",
-    }
-    for i in range(0, len(stale_ids), 50):
-        batch_ids = stale_ids[i : i + 50]
-        id_filter = ",".join(batch_ids)
-        dr = requests.delete(
-            f"{url}/rest/v1/bets",
-            headers=del_headers,
-            params={"id": f"in.({id_filter})"},
+
+    def delete(batch_ids):
+        return _send(
+            client, sem, "DELETE", bets_url,
+            headers=DELETE_HEADERS,
+            params={"id": f"in.({','.join(batch_ids)})"},
         )
+
+    # As many ids per request as fit the URL budget (capped at 300)
+    avg_len = sum(map(len, stale_ids)) / len(stale_ids)
+    chunk = max(1, min(300, int(MAX_FILTER_CHARS // (avg_len + 1))))
+    chunks = [stale_ids[i : i + chunk] for i in range(0, len(stale_ids), chunk)]
+    for dr in await asyncio.gather(*map(delete, chunks)):
         if dr.status_code not in (200, 204):
             print(f"  WARNING: Delete failed: {dr.status_code} {dr.text[:200]}")
 
 
-def main():
+async def main():
     url, key = get_supabase_config()
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "resolution=merge-duplicates,return=minimal",
-    }
+    bets_url = f"{url}/rest/v1/bets"
 
     predictions = load_predictions()
     print(f"Loaded {len(predictions)} predictions from {PREDICTIONS_FILE.name}")
 
-    # Convert to bet records
-    bets = []
+    # Convert to bet records, one per match: the last prediction for a match
+    # wins (Postgres also rejects an upsert that hits the same row twice)
+    bets_by_id = {}
     for pred in predictions:
         bet = prediction_to_bet(pred)
         if bet and bet["id"]:
-            bets.append(bet)
+            bets_by_id[bet["id"]] = bet
+    bets = list(bets_by_id.values())
 
     print(f"  {len(bets)} with recommended bets")
 
@@ -179,30 +292,40 @@ def main():
         print("  Nothing to sync.")
         return
 
-    # Clean up stale unresolved bets for the same dates
-    current_ids = {b["id"] for b in bets}
-    bet_dates = {b["date"] for b in bets if b["date"]}
-    delete_stale_pending(url, headers, current_ids, bet_dates)
+    # At most MAX_WORKERS requests in flight, to stay clear of rate limits
+    sem = asyncio.Semaphore(MAX_WORKERS)
+    async with get_client(key) as client:
+        # Clean up stale unresolved bets for the same dates
+        current_ids = set(bets_by_id)
+        bet_dates = {b["date"] for b in bets if b["date"]}
+        await delete_stale_pending(client, sem, bets_url, current_ids, bet_dates)
+
+        # Upsert pre-serialized batches concurrently on the shared client
+        batches = [bets[i : i + BATCH_SIZE] for i in range(0, len(bets), BATCH_SIZE)]
+
+        async def upsert(body):
+            r = await _post(client, sem, bets_url, body, UPSERT_HEADERS)
+            if r.status_code >= 500:  # one more try before giving up; 4xx won't change
+                r = await _post(client, sem, bets_url, body, UPSERT_HEADERS)
+            return r
+
+        results = await asyncio.gather(*(upsert(_dumps(batch)) for batch in batches))
 
-    # Upsert in batches of 100
-    BATCH = 100
     total = 0
-    for i in range(0, len(bets), BATCH):
-        batch = bets[i : i + BATCH]
-        r = requests.post(
-            f"{url}/rest/v1/bets",
-            headers=headers,
-            json=batch,
-        )
+    for n, (batch, r) in enumerate(zip(batches, results), 1):
         if r.status_code in (200, 201):
             total += len(batch)
             print(f"  Upserted {total}/{len(bets)}")
         else:
-            print(f"  FAILED batch {i // BATCH + 1}: {r.status_code} {r.text[:200]}")
-            break
+            print(f"  FAILED batch {n}: {r.status_code} {r.text[:200]}")
+
+    if total < len(bets):
+        # Other batches may have gone through: fail so cron/CI sees the partial sync
+        print(f"ERROR: only {total}/{len(bets)} pending bets synced to Supabase.")
+        sys.exit(1)
 
     print(f"Done. {total} pending bets synced to Supabase.")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -17,20 +17,47 @@ Hypotheses:
   H10: BTTS and alternative O/U lines (1.5, 3.5)
 """
 
+import contextlib
+import io
+import os
 import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
 from loguru import logger
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # numba is optional: without it the decorated helpers run as plain Python
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.data.football_data_uk import load_historical_data, STAT_COLS
 from src.models.dixon_coles import DixonColesModel, MatchResult
 from src.models.elo import EloRating, EloMatch
-from src.models.prop_models import remove_margin_2way, remove_margin_3way
+from src.models.prop_models import remove_margin_2way
+
+
+def _remove_margin_3way_cols(odds):
+    """remove_margin_3way over the rows of an (n, 3) odds array.
+
+    Rows whose odds are not all above 1.0 give (0.0, 0.0, 0.0).
+    """
+    valid = (odds > 1.0).all(axis=1)
+    raw = np.divide(1.0, odds, out=np.zeros_like(odds), where=valid[:, None])
+    total = raw[:, 0] + raw[:, 1] + raw[:, 2]
+    return raw / np.where(valid, total, 1.0)[:, None]
 
 
 def build_match_results(matches):
@@ -44,13 +71,104 @@ def build_match_results(matches):
     ]
 
 
+def _captured(fn, *args, **kwargs):
+    """Call fn (in a worker process), returning its result and its printed log."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        result = fn(*args, **kwargs)
+    return result, buf.getvalue()
+
+
+def _fit_dc(job):
+    """Fit one Dixon-Coles model on a training window (picklable worker).
+
+    Returns None if the window is too small to fit.
+    """
+    half_life, train = job
+    model = DixonColesModel(half_life_days=half_life)
+    try:
+        return model.fit(train)
+    except ValueError:
+        return None
+
+
+# (won, odds, edge, prob) bet records
+BET_DTYPE = np.dtype([("won", "?"), ("odds", "f8"), ("edge", "f8"), ("prob", "f8")])
+
+
+class BetBuf:
+    """Bets of one hypothesis as rows of a preallocated (won, odds, edge, prob) array.
+
+    The array doubles in size when full. A push (won=None) counts as not won.
+    """
+
+    def __init__(self, capacity=256):
+        self.arr = np.empty((capacity, 4))
+        self.n = 0
+
+    def push(self, won, odds, edge=0.0, prob=0.0):
+        if self.n == len(self.arr):
+            self.arr = np.concatenate([self.arr, np.empty_like(self.arr)])
+        self.arr[self.n] = (1.0 if won else 0.0, odds, edge, prob)
+        self.n += 1
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def won(self):
+        return self.arr[:self.n, 0] != 0.0
+
+    @property
+    def odds(self):
+        return self.arr[:self.n, 1]
+
+    def records(self):
+        """The bets as a BET_DTYPE structured array."""
+        rec = np.empty(self.n, dtype=BET_DTYPE)
+        for k, name in enumerate(BET_DTYPE.names):
+            rec[name] = self.arr[:self.n, k]
+        return rec
+
+
 def roi_stats(bets):
-    """Calculate ROI stats from list of (won, odds) tuples."""
-    if not bets:
+    """Calculate ROI stats from a BetBuf."""
+    return roi_stats_arr(bets.won, bets.odds)
+
+
+@njit(cache=True)
+def _roi_kernel(won, odds):
+    """Compiled (wins, pnl) loop for roi_stats_arr."""
+    wins = 0
+    pnl = 0.0
+    for k in range(won.shape[0]):
+        if won[k]:
+            pnl += odds[k] - 1.0
+            wins += 1
+        else:
+            pnl -= 1.0
+    return wins, pnl
+
+
+def roi_stats_arr(won, odds):
+    """ROI stats for bets given as parallel won (bool) and odds arrays.
+
+    The PnL is summed in bet order either way (a loop, or cumsum rather
+    than a pairwise sum), so results don't depend on numba.
+    """
+    if len(won) == 0:
+        return _roi_dict(0, 0, 0.0)
+    if HAVE_NUMBA:
+        wins, pnl = _roi_kernel(won, odds)
+    else:
+        wins = int(np.count_nonzero(won))
+        pnl = float(np.cumsum(np.where(won, odds - 1.0, -1.0))[-1])
+    return _roi_dict(len(won), wins, pnl)
+
+
+def _roi_dict(n, wins, pnl):
+    if n == 0:
         return {"n": 0, "roi": 0, "pnl": 0, "win_rate": 0}
-    n = len(bets)
-    wins = sum(1 for w, _ in bets if w)
-    pnl = sum((o - 1.0) if w else -1.0 for w, o in bets)
     return {
         "n": n,
         "roi": round(pnl / n * 100, 1),
@@ -70,7 +188,7 @@ def print_result(label, stats):
           f"PnL {stats['pnl']:>+7.1f}u{marker}")
 
 
-def run_all_hypotheses(league="ligue_1", seasons=None):
+def run_all_hypotheses(league="ligue_1", seasons=None, workers=1):
     if seasons is None:
         seasons = [2020, 2021, 2022, 2023, 2024]
 
@@ -85,16 +203,77 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
     min_train = 100
     refit = 120  # fewer DC refits for speed
 
+    # Per-match columns, built once: 1X2 odds (Pinnacle opening, best
+    # available, Pinnacle closing), their margin-free probabilities and the
+    # 1X2 outcome (0=home, 1=draw, 2=away)
+    odds_1x2 = np.array([
+        (m.get("pinnacle_home", 0), m.get("pinnacle_draw", 0), m.get("pinnacle_away", 0),
+         m.get("max_home", m.get("pinnacle_home", 0)), m.get("max_draw", m.get("pinnacle_draw", 0)),
+         m.get("max_away", m.get("pinnacle_away", 0)),
+         # our parser mapped PSCH/PSCD/PSCA (closing 1X2) as pinnacle_corner_*
+         m.get("pinnacle_corner_home", 0), m.get("pinnacle_corner_draw", 0),
+         m.get("pinnacle_corner_away", 0))
+        for m in matches
+    ], dtype=np.float64).reshape(n, 9)
+    has_open = (odds_1x2[:, 0:3] > 1.0).all(axis=1).tolist()
+    has_close = (odds_1x2[:, 6:9] > 1.0).all(axis=1).tolist()
+    fair_open = _remove_margin_3way_cols(odds_1x2[:, 0:3]).tolist()
+    fair_close = _remove_margin_3way_cols(odds_1x2[:, 6:9]).tolist()
+    scores = np.array([(m["home_score"], m["away_score"]) for m in matches]).reshape(n, 2)
+    outcomes = np.where(
+        scores[:, 0] > scores[:, 1], 0, np.where(scores[:, 0] == scores[:, 1], 1, 2),
+    ).tolist()
+    odds_1x2 = odds_1x2.tolist()
+
     # === Setup models ===
     elo_std = EloRating(k_factor=32, home_advantage=100)
     elo_form = EloRating(k_factor=64, home_advantage=100)  # H1: higher K
-    elo_home = {}  # H2: home/away split - {team: {home_elo, away_elo}}
-    dc = None
-    dc_short = None  # H5: shorter half-life
-
-    # Track matchday per season
-    season_matchdays = defaultdict(int)
-    season_match_count = defaultdict(int)
+    # H2: home/away split - separate home and away ratings per team id
+    team_idx = {}
+    for m in matches:
+        team_idx.setdefault(m["home_team"], len(team_idx))
+        team_idx.setdefault(m["away_team"], len(team_idx))
+    home_idx = np.array([team_idx[m["home_team"]] for m in matches], dtype=np.int64)
+    away_idx = np.array([team_idx[m["away_team"]] for m in matches], dtype=np.int64)
+    # H2 ratings depend only on results, so every pre-match prediction is
+    # computed up front in one pass
+    ha_elo_1x2 = _home_away_elo_probs(home_idx, away_idx, scores, len(team_idx)).tolist()
+
+    # Matches played per team so far (H6), kept up to date with the ELO models
+    team_match_count = defaultdict(int)
+
+    # Dixon-Coles is refit every `refit` matches on all matches before the
+    # refit point. The fits don't depend on each other, so they are all done
+    # up front: in worker processes when workers > 1.
+    dc_train = build_match_results(matches)
+    fit_jobs = [
+        (half_life, dc_train[:p])
+        for p in range(min_train, n, refit)
+        for half_life in (180, 90)  # H5: shorter half-life
+    ]
+    if workers > 1 and len(fit_jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(fit_jobs))) as pool:
+            fitted = list(pool.map(_fit_dc, fit_jobs))
+    else:
+        fitted = list(map(_fit_dc, fit_jobs))
+    dc_models, dc_short_models = fitted[0::2], fitted[1::2]
+
+    # Approximate matchday for H4 (20 teams = 10 matches per matchday),
+    # counting only the tested matches of each season: those with opening
+    # odds, from min_train on, in a refit window whose DC fits succeeded
+    fits_ok = np.array([
+        dc is not None and dc_short is not None
+        for dc, dc_short in zip(dc_models, dc_short_models)
+    ], dtype=bool)
+    tested = np.zeros(n, dtype=bool)
+    tested[min_train:] = fits_ok[(np.arange(min_train, n) - min_train) // refit]
+    tested &= np.array(has_open, dtype=bool)
+    season_arr = np.array([m.get("season", 0) for m in matches])
+    matchday_arr = np.zeros(n, dtype=np.int64)
+    for season in np.unique(season_arr[tested]):
+        idx = np.flatnonzero(tested & (season_arr == season))
+        matchday_arr[idx] = np.arange(1, len(idx) + 1) // 10 + 1
+    matchday_arr = matchday_arr.tolist()
 
     # Initialize models on training window
     for m in matches[:min_train]:
@@ -104,16 +283,17 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
         )
         elo_std.update(em)
         elo_form.update(em)
-        _update_home_away_elo(elo_home, m)
+        team_match_count[m["home_team"]] += 1
+        team_match_count[m["away_team"]] += 1
 
     # Collect bets per hypothesis
-    H = {f"H{i}": [] for i in range(1, 11)}
-    H["baseline"] = []
-    H["baseline_with_edge"] = []  # (won, odds, edge) for threshold analysis
-    H["H7_lines"] = defaultdict(list)  # per AH line
-    H["H10_ou15"] = []
-    H["H10_ou35"] = []
-    H["H10_btts"] = []
+    H = {f"H{i}": BetBuf() for i in range(1, 11)}
+    H["baseline"] = BetBuf()
+    H["baseline_with_edge"] = BetBuf()  # with edge and prob for threshold analysis
+    H["H7_lines"] = defaultdict(BetBuf)  # per AH line
+    H["H10_ou15"] = BetBuf()
+    H["H10_ou35"] = BetBuf()
+    H["H10_btts"] = BetBuf()
     # H3: CLV tracking
     h3_clv = {"correct": 0, "total": 0, "magnitude": []}
 
@@ -129,85 +309,69 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
             )
             elo_std.update(em)
             elo_form.update(em)
-            _update_home_away_elo(elo_home, prev)
-
-        # Refit DC
-        if dc is None or (i - min_train) % refit == 0:
-            dc_train = build_match_results(matches[:i])
-            dc = DixonColesModel(half_life_days=180)
-            dc_short = DixonColesModel(half_life_days=90)  # H5
-            try:
-                dc.fit(dc_train)
-                dc_short.fit(dc_train)
-            except ValueError:
-                continue
+            team_match_count[prev["home_team"]] += 1
+            team_match_count[prev["away_team"]] += 1
+
+        # Switch to the DC models fitted at this refit point
+        if (i - min_train) % refit == 0:
+            epoch = (i - min_train) // refit
+            dc, dc_short = dc_models[epoch], dc_short_models[epoch]
+        if dc is None or dc_short is None:
+            continue
+
+        # Only matches with opening 1X2 odds are tested
+        if not has_open[i]:
+            continue
 
         # Predictions
         dc_pred = dc.predict(test["home_team"], test["away_team"])
         dc_short_pred = dc_short.predict(test["home_team"], test["away_team"])
         elo_probs = elo_std.predict_1x2(test["home_team"], test["away_team"])
         elo_form_probs = elo_form.predict_1x2(test["home_team"], test["away_team"])
-        ha_elo_probs = _predict_home_away_elo(elo_home, test["home_team"], test["away_team"])
-
-        # Ensemble: DC 0.65 + ELO 0.35
-        ens = _ensemble(dc_pred, elo_probs, 0.65, 0.35)
+        ha_h, ha_d, ha_a = ha_elo_1x2[i]
+        ha_elo_probs = {"home": ha_h, "draw": ha_d, "away": ha_a}
 
         # Actual outcome
         hs, aws = test["home_score"], test["away_score"]
-        outcome_1x2 = 0 if hs > aws else (1 if hs == aws else 2)
+        outcome_1x2 = outcomes[i]
 
-        # Opening odds (PSH/PSD/PSA)
-        pin_h = test.get("pinnacle_home", 0)
-        pin_d = test.get("pinnacle_draw", 0)
-        pin_a = test.get("pinnacle_away", 0)
-        if not (pin_h > 1.0 and pin_d > 1.0 and pin_a > 1.0):
-            continue
+        # Opening odds (PSH/PSD/PSA), best odds and closing odds (PSCH/PSCD/PSCA)
+        (pin_h, pin_d, pin_a, max_h, max_d, max_a,
+         closing_h_actual, closing_d_actual, closing_a_actual) = odds_1x2[i]
+        fair = fair_open[i]
+        best_odds = (max_h, max_d, max_a)
 
-        max_h = test.get("max_home", pin_h)
-        max_d = test.get("max_draw", pin_d)
-        max_a = test.get("max_away", pin_a)
+        # Ensemble: DC 0.65 + ELO 0.35, with each outcome's edge vs opening fair
+        ens, edges = _ensemble_edges(dc_pred, elo_probs, 0.65, 0.35, fair, best_odds)
 
-        fair_h, fair_d, fair_a = remove_margin_3way(pin_h, pin_d, pin_a)
-
-        # Track matchday for H4
-        season = test.get("season", 0)
-        season_match_count[season] += 1
-        # Approximate matchday (20 teams = 10 matches per matchday)
-        matchday = season_match_count[season] // 10 + 1
+        matchday = matchday_arr[i]
 
         # ─── BASELINE: Standard ensemble, 5% edge ───
-        _check_1x2_edge(H["baseline"], ens, fair_h, fair_d, fair_a,
-                        max_h, max_d, max_a, outcome_1x2, min_edge=5.0)
+        _check_1x2_edge(H["baseline"], edges, best_odds, outcome_1x2, min_edge=5.0)
         # Also store with edge for threshold analysis (min_edge=0)
-        _check_1x2_edge_with_data(H["baseline_with_edge"], ens, fair_h, fair_d, fair_a,
-                                   max_h, max_d, max_a, outcome_1x2, min_edge=0.0)
+        _check_1x2_edge_with_data(H["baseline_with_edge"], ens, edges, best_odds,
+                                  outcome_1x2, min_edge=0.0)
 
         # ─── H1: Form ELO (K=64) instead of standard ───
-        ens_form = _ensemble(dc_pred, elo_form_probs, 0.65, 0.35)
-        _check_1x2_edge(H["H1"], ens_form, fair_h, fair_d, fair_a,
-                        max_h, max_d, max_a, outcome_1x2, min_edge=5.0)
+        _, edges_form = _ensemble_edges(dc_pred, elo_form_probs, 0.65, 0.35, fair, best_odds)
+        _check_1x2_edge(H["H1"], edges_form, best_odds, outcome_1x2, min_edge=5.0)
 
         # ─── H2: Home/Away ELO split ───
-        ens_ha = _ensemble(dc_pred, ha_elo_probs, 0.65, 0.35)
-        _check_1x2_edge(H["H2"], ens_ha, fair_h, fair_d, fair_a,
-                        max_h, max_d, max_a, outcome_1x2, min_edge=5.0)
+        _, edges_ha = _ensemble_edges(dc_pred, ha_elo_probs, 0.65, 0.35, fair, best_odds)
+        _check_1x2_edge(H["H2"], edges_ha, best_odds, outcome_1x2, min_edge=5.0)
 
         # ─── H3: Closing Line Value ───
         # Do we predict the direction the line moves?
-        closing_h = test.get("pinnacle_home", 0)
         # We used opening odds as pinnacle_home. But wait -
         # in our data, PSH = opening, PSCH = closing
         # We need to check if closing odds are different from opening
         # Unfortunately, our parser mapped PSCH as "pinnacle_corner_home"
-        # which is actually closing 1X2. Let's use that!
-        closing_h_actual = test.get("pinnacle_corner_home", 0)  # actually PSCH = closing home
-        closing_d_actual = test.get("pinnacle_corner_draw", 0)  # actually PSCD = closing draw
-        closing_a_actual = test.get("pinnacle_corner_away", 0)  # actually PSCA = closing away
+        # which is actually closing 1X2 (closing_*_actual above). Let's use that!
         if closing_h_actual > 1.0 and pin_h > 1.0:
             # Opening implied prob
             open_prob_h = 1 / pin_h
             close_prob_h = 1 / closing_h_actual
-            model_prob_h = ens["home"]
+            model_prob_h = ens[0]
             # Model says home is more likely than opening implies
             model_says_higher = model_prob_h > open_prob_h
             # Line moved towards higher (closing prob > opening prob)
@@ -219,34 +383,26 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
                 h3_clv["magnitude"].append(abs(close_prob_h - open_prob_h))
 
         # Also test: bet using OPENING odds, settle at closing fair value
-        fair_ch, fair_cd, fair_ca = (0, 0, 0)
-        if closing_h_actual > 1.0 and closing_d_actual > 1.0 and closing_a_actual > 1.0:
-            fair_ch, fair_cd, fair_ca = remove_margin_3way(
-                closing_h_actual, closing_d_actual, closing_a_actual
-            )
+        if has_close[i]:
+            fair_ch, fair_cd, fair_ca = fair_close[i]
             # Edge vs CLOSING odds (harder benchmark)
-            _check_1x2_edge(H["H3"], ens, fair_ch, fair_cd, fair_ca,
-                            max_h, max_d, max_a, outcome_1x2, min_edge=5.0)
+            edges_close = _edges_1x2(*ens, fair_ch, fair_cd, fair_ca, max_h, max_d, max_a)
+            _check_1x2_edge(H["H3"], edges_close, best_odds, outcome_1x2, min_edge=5.0)
 
         # ─── H4: Early season (matchday <= 6) ───
         if matchday <= 6:
-            _check_1x2_edge(H["H4"], ens, fair_h, fair_d, fair_a,
-                            max_h, max_d, max_a, outcome_1x2, min_edge=3.0)
+            _check_1x2_edge(H["H4"], edges, best_odds, outcome_1x2, min_edge=3.0)
 
         # ─── H5: Shorter DC half-life (90 days) ───
-        ens_short = _ensemble(dc_short_pred, elo_probs, 0.65, 0.35)
-        _check_1x2_edge(H["H5"], ens_short, fair_h, fair_d, fair_a,
-                        max_h, max_d, max_a, outcome_1x2, min_edge=5.0)
+        _, edges_short = _ensemble_edges(dc_short_pred, elo_probs, 0.65, 0.35, fair, best_odds)
+        _check_1x2_edge(H["H5"], edges_short, best_odds, outcome_1x2, min_edge=5.0)
 
         # ─── H6: Promoted teams ───
         # Simple proxy: team has fewer than 40 matches in training data
-        home_matches = sum(1 for m in matches[:i]
-                          if m["home_team"] == test["home_team"] or m["away_team"] == test["home_team"])
-        away_matches = sum(1 for m in matches[:i]
-                          if m["home_team"] == test["away_team"] or m["away_team"] == test["away_team"])
+        home_matches = team_match_count[test["home_team"]]
+        away_matches = team_match_count[test["away_team"]]
         if home_matches < 40 or away_matches < 40:
-            _check_1x2_edge(H["H6"], ens, fair_h, fair_d, fair_a,
-                            max_h, max_d, max_a, outcome_1x2, min_edge=3.0)
+            _check_1x2_edge(H["H6"], edges, best_odds, outcome_1x2, min_edge=3.0)
 
         # ─── H7: Asian Handicap ───
         ah_line = test.get("ah_line", 0)
@@ -258,7 +414,9 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
             # Calculate model prob of covering the handicap
             goal_diff = hs - aws
             # Home covers if goal_diff > -ah_line (ah_line is usually negative for favorites)
-            model_cover_home = _prob_cover_ah(dc_pred.score_matrix, ah_line)
+            model_cover_home = _prob_cover_ah(
+                np.ascontiguousarray(dc_pred.score_matrix, dtype=np.float64), float(ah_line),
+            )
             model_cover_away = 1.0 - model_cover_home
 
             fair_ahh, fair_aha = remove_margin_2way(pin_ahh, pin_aha)
@@ -273,30 +431,25 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
                     continue
                 edge = ((model_p - fair_p) / fair_p) * 100
                 if edge >= 5.0:
-                    H["H7"].append((won, best_o))
-                    H["H7_lines"][ah_line].append((won, best_o, edge))
+                    H["H7"].push(won, best_o)
+                    H["H7_lines"][ah_line].push(won, best_o, edge)
 
         # ─── H8: Favorite-longshot bias ───
         # Test: are big underdogs (odds > 4.0) profitable?
-        for _, model_p, fair_p, best_o, win_idx in [
-            ("home", ens["home"], fair_h, max_h, 0),
-            ("draw", ens["draw"], fair_d, max_d, 1),
-            ("away", ens["away"], fair_a, max_a, 2),
-        ]:
-            if best_o > 4.0 and fair_p > 0:
-                edge = ((model_p - fair_p) / fair_p) * 100
-                if edge >= 3.0:
-                    won = outcome_1x2 == win_idx
-                    H["H8"].append((won, best_o))
+        for win_idx in range(3):
+            best_o = best_odds[win_idx]
+            if best_o > 4.0 and edges[win_idx] >= 3.0:
+                won = outcome_1x2 == win_idx
+                H["H8"].push(won, best_o)
 
         # ─── H9: Model agreement filter ───
         # When DC and ELO agree strongly AND differ from market
-        dc_probs = [dc_pred.home_win, dc_pred.draw, dc_pred.away_win]
-        elo_arr = [elo_probs["home"], elo_probs["draw"], elo_probs["away"]]
-        disagreement = sum(abs(a - b) for a, b in zip(dc_probs, elo_arr))
+        disagreement = _l1_3(
+            dc_pred.home_win, dc_pred.draw, dc_pred.away_win,
+            elo_probs["home"], elo_probs["draw"], elo_probs["away"],
+        )
         if disagreement < 0.10:  # Models strongly agree
-            _check_1x2_edge(H["H9"], ens, fair_h, fair_d, fair_a,
-                            max_h, max_d, max_a, outcome_1x2, min_edge=5.0)
+            _check_1x2_edge(H["H9"], edges, best_odds, outcome_1x2, min_edge=5.0)
 
         # ─── H10: BTTS + alternative O/U lines ───
         pin_o25 = test.get("pinnacle_over25", 0)
@@ -308,26 +461,12 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
         if pin_o25 > 1.0 and pin_u25 > 1.0:
             fair_over, fair_under = remove_margin_2way(pin_o25, pin_u25)
 
-            # O/U 2.5 from score matrix (more accurate than lambda-based)
-            model_o25 = float(sum(
-                dc_pred.score_matrix[i, j]
-                for i in range(9) for j in range(9) if i + j > 2
-            ))
-
-            # BTTS from score matrix
-            model_btts = float(dc_pred.score_matrix[1:, 1:].sum())
-
-            # O/U 1.5
-            model_o15 = float(sum(
-                dc_pred.score_matrix[i, j]
-                for i in range(9) for j in range(9) if i + j > 1
-            ))
-
-            # O/U 3.5
-            model_o35 = float(sum(
-                dc_pred.score_matrix[i, j]
-                for i in range(9) for j in range(9) if i + j > 3
-            ))
+            # O/U lines and BTTS from the score matrix (more accurate than
+            # lambda-based); DC predict() already sums these cells
+            model_o25 = dc_pred.over_25
+            model_btts = dc_pred.btts_yes
+            model_o15 = dc_pred.over_15
+            model_o35 = dc_pred.over_35
 
             # Test O/U 2.5 with score matrix
             for name, model_p, fair_p, best_o, won in [
@@ -337,7 +476,7 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
                 if fair_p > 0 and best_o > 1.0:
                     edge = ((model_p - fair_p) / fair_p) * 100
                     if edge >= 5.0:
-                        H["H10_ou15"].append((won, best_o))
+                        H["H10_ou15"].push(won, best_o)
 
             # For O/U 1.5 and 3.5, we don't have odds so we use O/U 2.5 odds as proxy
             # Actually skip these - no odds available
@@ -346,14 +485,20 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
         # (tracked separately, not a bet)
 
     # ═══════ PRINT RESULTS ═══════
+    results = {
+        name: roi_stats(H[name])
+        for name in ["baseline", "H1", "H2", "H3", "H4", "H5", "H6", "H7", "H8", "H9"]
+    }
+    results["H10"] = roi_stats(H["H10_ou15"])
+
     print(f"\n  {'─'*72}")
     print(f"  RESULTS")
     print(f"  {'─'*72}")
 
-    print_result("BASELINE: DC(0.65)+ELO(0.35), edge>=5%", roi_stats(H["baseline"]))
+    print_result("BASELINE: DC(0.65)+ELO(0.35), edge>=5%", results["baseline"])
     print()
-    print_result("H1: Form ELO (K=64 vs K=32)", roi_stats(H["H1"]))
-    print_result("H2: Home/Away ELO split", roi_stats(H["H2"]))
+    print_result("H1: Form ELO (K=64 vs K=32)", results["H1"])
+    print_result("H2: Home/Away ELO split", results["H2"])
 
     if h3_clv["total"] > 0:
         clv_rate = h3_clv["correct"] / h3_clv["total"] * 100
@@ -362,36 +507,46 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
         print(f"      Line prediction accuracy: {clv_rate:.1f}% ({h3_clv['correct']}/{h3_clv['total']})")
         print(f"      Avg line movement: {avg_mag:.1f}pp")
         print(f"      (>50% = model predicts direction of smart money)")
-    print_result("H3: Edge vs CLOSING odds (harder test)", roi_stats(H["H3"]))
+    print_result("H3: Edge vs CLOSING odds (harder test)", results["H3"])
 
     print()
-    print_result("H4: Early season only (matchday 1-6, edge>=3%)", roi_stats(H["H4"]))
-    print_result("H5: DC half-life 90 days (vs 180)", roi_stats(H["H5"]))
-    print_result("H6: Promoted/new teams (< 40 matches, edge>=3%)", roi_stats(H["H6"]))
+    print_result("H4: Early season only (matchday 1-6, edge>=3%)", results["H4"])
+    print_result("H5: DC half-life 90 days (vs 180)", results["H5"])
+    print_result("H6: Promoted/new teams (< 40 matches, edge>=3%)", results["H6"])
 
     print()
-    print_result("H7: Asian Handicap (edge>=5%)", roi_stats(H["H7"]))
+    print_result("H7: Asian Handicap (edge>=5%)", results["H7"])
     if H["H7_lines"]:
         print(f"      By line:")
         for line in sorted(H["H7_lines"].keys()):
-            bets = H["H7_lines"][line]
-            s = roi_stats([(w, o) for w, o, _ in bets])
+            s = roi_stats(H["H7_lines"][line])
             if s["n"] >= 5:
                 print(f"        AH {line:+.2f}: {s['n']:>4} bets, ROI {s['roi']:>+6.1f}%")
 
     print()
-    print_result("H8: Big underdogs (odds>4.0, edge>=3%)", roi_stats(H["H8"]))
-    print_result("H9: DC+ELO agree (disagreement<0.10, edge>=5%)", roi_stats(H["H9"]))
-    print_result("H10: O/U 2.5 via score matrix (edge>=5%)", roi_stats(H["H10_ou15"]))
+    print_result("H8: Big underdogs (odds>4.0, edge>=3%)", results["H8"])
+    print_result("H9: DC+ELO agree (disagreement<0.10, edge>=5%)", results["H9"])
+    print_result("H10: O/U 2.5 via score matrix (edge>=5%)", results["H10"])
 
     # ─── Edge threshold analysis (from stored data, no recompute) ───
     print(f"\n  {'─'*72}")
     print(f"  EDGE THRESHOLD ANALYSIS")
     print(f"  {'─'*72}")
-    all_edge_bets = H["baseline_with_edge"]
+    # Bets as columns, indexed by edge (descending): every "edge >= x" subset
+    # is a prefix of that index, found with one binary search. Subsets are
+    # returned in bet order so their PnL adds up exactly as before.
+    edge_bets = H["baseline_with_edge"].records()
+    by_edge = np.argsort(-edge_bets["edge"], kind="stable")
+    neg_edges = -edge_bets["edge"][by_edge]
+
+    def edge_at_least(min_e, side="right"):
+        return edge_bets[np.sort(by_edge[:np.searchsorted(neg_edges, -min_e, side=side)])]
+
+    def stats(bets):
+        return roi_stats_arr(bets["won"], bets["odds"])
+
     for min_e in [0.0, 2.0, 3.0, 5.0, 8.0, 10.0, 15.0, 20.0, 30.0]:
-        filtered = [(w, o) for w, o, e, p in all_edge_bets if e >= min_e]
-        print_result(f"Edge >= {min_e:>4.0f}%", roi_stats(filtered))
+        print_result(f"Edge >= {min_e:>4.0f}%", stats(edge_at_least(min_e)))
 
     # ─── PROBABILITY BAND ANALYSIS ───
     print(f"\n  {'─'*72}")
@@ -408,128 +563,182 @@ def run_all_hypotheses(league="ligue_1", seasons=None):
         (0.75, 1.01, "Strong fav (75%+)"),
     ]
 
-    print(f"\n  --- Any positive edge (edge > 0%) ---")
-    for lo, hi, label in prob_bands:
-        filtered = [(w, o) for w, o, e, p in all_edge_bets if lo <= p < hi and e > 0]
-        print_result(f"{label}", roi_stats(filtered))
-
-    print(f"\n  --- Edge >= 3% ---")
-    for lo, hi, label in prob_bands:
-        filtered = [(w, o) for w, o, e, p in all_edge_bets if lo <= p < hi and e >= 3.0]
-        print_result(f"{label}", roi_stats(filtered))
-
-    print(f"\n  --- Edge >= 5% ---")
-    for lo, hi, label in prob_bands:
-        filtered = [(w, o) for w, o, e, p in all_edge_bets if lo <= p < hi and e >= 5.0]
-        print_result(f"{label}", roi_stats(filtered))
-
-    print(f"\n  --- Edge >= 10% ---")
-    for lo, hi, label in prob_bands:
-        filtered = [(w, o) for w, o, e, p in all_edge_bets if lo <= p < hi and e >= 10.0]
-        print_result(f"{label}", roi_stats(filtered))
+    # Every (edge threshold, band) cell in one broadcast pass over the bets:
+    # member[t, b, j] is whether bet j falls in band b with edge past threshold t
+    edge_rows = [
+        ("Any positive edge (edge > 0%)", edge_bets["edge"] > 0),
+        ("Edge >= 3%", edge_bets["edge"] >= 3.0),
+        ("Edge >= 5%", edge_bets["edge"] >= 5.0),
+        ("Edge >= 10%", edge_bets["edge"] >= 10.0),
+    ]
+    band_bounds = [lo for lo, _, _ in prob_bands] + [prob_bands[-1][1]]
+    band = np.digitize(edge_bets["prob"], band_bounds) - 1  # lo <= prob < hi
+    in_band = band == np.arange(len(prob_bands))[:, None]
+    member = np.stack([mask for _, mask in edge_rows])[:, None, :] & in_band[None]
+    n_grid = member.sum(axis=-1)
+    win_grid = (member & edge_bets["won"]).sum(axis=-1)
+    # PnL per cell summed in bet order (zeros for other bets) to match roi_stats
+    pnl_grid = np.zeros(member.shape[:2])
+    if len(edge_bets):
+        bet_pnl = np.where(edge_bets["won"], edge_bets["odds"] - 1.0, -1.0)
+        pnl_grid = np.cumsum(np.where(member, bet_pnl, 0.0), axis=-1)[..., -1]
+
+    for t, (header, _) in enumerate(edge_rows):
+        print(f"\n  --- {header} ---")
+        for b, (_, _, label) in enumerate(prob_bands):
+            cell = _roi_dict(int(n_grid[t, b]), int(win_grid[t, b]), float(pnl_grid[t, b]))
+            print_result(f"{label}", cell)
 
     # The user's hypothesis: strong favorites (75%+) with any edge
     print(f"\n  {'─'*72}")
     print(f"  USER HYPOTHESIS: Strong favorites (prob >= 75%) + positive edge")
     print(f"  {'─'*72}")
     for min_e in [0.0, 1.0, 2.0, 3.0, 5.0, 8.0, 10.0]:
-        filtered = [(w, o) for w, o, e, p in all_edge_bets if p >= 0.75 and e >= min_e]
-        print_result(f"Prob >= 75% & Edge >= {min_e:.0f}%", roi_stats(filtered))
+        bets = edge_at_least(min_e)
+        print_result(f"Prob >= 75% & Edge >= {min_e:.0f}%", stats(bets[bets["prob"] >= 0.75]))
 
     # Also test 65%+ and 60%+
     print()
     for min_prob in [0.60, 0.65, 0.70, 0.75]:
         for min_e in [3.0, 5.0, 10.0]:
-            filtered = [(w, o) for w, o, e, p in all_edge_bets if p >= min_prob and e >= min_e]
-            print_result(f"Prob >= {min_prob*100:.0f}% & Edge >= {min_e:.0f}%", roi_stats(filtered))
+            bets = edge_at_least(min_e)
+            print_result(f"Prob >= {min_prob*100:.0f}% & Edge >= {min_e:.0f}%",
+                         stats(bets[bets["prob"] >= min_prob]))
+
+    return results
+
+
+def run_leagues(leagues, seasons=None, workers=None):
+    """Run run_all_hypotheses on several leagues, one worker process per league.
+
+    Leagues are independent, so they run in parallel; the remaining cores
+    are split between each league's DC refits. Every league's report is
+    printed as one block once it finishes.
+
+    Returns dict: league -> run_all_hypotheses results.
+    """
+    cpus = workers or os.cpu_count() or 1
+    league_workers = min(len(leagues), cpus)
+    fit_workers = max(1, cpus // league_workers)
+    if league_workers <= 1:
+        return {
+            league: run_all_hypotheses(league, seasons, workers=fit_workers) for league in leagues
+        }
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=league_workers) as pool:
+        futures = {
+            pool.submit(_captured, run_all_hypotheses, league, seasons, workers=fit_workers): league
+            for league in leagues
+        }
+        for future in as_completed(futures):
+            league_results, log = future.result()
+            print(log, end="", flush=True)
+            results[futures[future]] = league_results
+    return {league: results[league] for league in leagues}
+
+
+@njit(cache=True)
+def _edge(model_p, fair_p, best_o):
+    """Edge (%) of model_p over fair_p; -inf when the outcome cannot be bet."""
+    if fair_p <= 0 or best_o <= 1.0:
+        return -np.inf
+    return ((model_p - fair_p) / fair_p) * 100
+
+
+@njit(cache=True)
+def _edges_1x2(p_h, p_d, p_a, fair_h, fair_d, fair_a, max_h, max_d, max_a):
+    return _edge(p_h, fair_h, max_h), _edge(p_d, fair_d, max_d), _edge(p_a, fair_a, max_a)
+
+
+@njit(cache=True)
+def _l1_3(a0, a1, a2, b0, b1, b2):
+    """L1 distance between two 1X2 probability triples."""
+    return abs(a0 - b0) + abs(a1 - b1) + abs(a2 - b2)
+
+
+@njit(cache=True)
+def _ensemble_kernel(dc_h, dc_d, dc_a, elo_h, elo_d, elo_a, w_dc, w_elo,
+                     fair_h, fair_d, fair_a, max_h, max_d, max_a):
+    h = w_dc * dc_h + w_elo * elo_h
+    d = w_dc * dc_d + w_elo * elo_d
+    a = w_dc * dc_a + w_elo * elo_a
+    t = h + d + a
+    h, d, a = h / t, d / t, a / t
+    return (h, d, a), _edges_1x2(h, d, a, fair_h, fair_d, fair_a, max_h, max_d, max_a)
 
 
-def _ensemble(dc_pred, elo_probs, w_dc, w_elo):
-    h = w_dc * dc_pred.home_win + w_elo * elo_probs["home"]
-    d = w_dc * dc_pred.draw + w_elo * elo_probs["draw"]
-    a = w_dc * dc_pred.away_win + w_elo * elo_probs["away"]
-    t = h + d + a
-    return {"home": h/t, "draw": d/t, "away": a/t}
+def _ensemble_edges(dc_pred, elo_probs, w_dc, w_elo, fair, best_odds):
+    """Blend DC and ELO 1X2 probabilities and compute each outcome's edge vs fair.
 
+    Returns ((home, draw, away), (edge_home, edge_draw, edge_away)) from one
+    compiled call; edges are -inf for outcomes that cannot be bet.
+    """
+    return _ensemble_kernel(
+        dc_pred.home_win, dc_pred.draw, dc_pred.away_win,
+        elo_probs["home"], elo_probs["draw"], elo_probs["away"],
+        w_dc, w_elo, *fair, *best_odds,
+    )
 
-def _check_1x2_edge(bets_list, ens, fair_h, fair_d, fair_a,
-                     max_h, max_d, max_a, outcome, min_edge=5.0):
-    for name, model_p, fair_p, best_o, win_idx in [
-        ("home", ens["home"], fair_h, max_h, 0),
-        ("draw", ens["draw"], fair_d, max_d, 1),
-        ("away", ens["away"], fair_a, max_a, 2),
-    ]:
-        if fair_p <= 0 or best_o <= 1.0:
-            continue
-        edge = ((model_p - fair_p) / fair_p) * 100
-        if edge >= min_edge:
+
+def _check_1x2_edge(bets, edges, best_odds, outcome, min_edge=5.0):
+    for win_idx in range(3):
+        if edges[win_idx] >= min_edge:
             won = outcome == win_idx
-            bets_list.append((won, best_o))
+            bets.push(won, best_odds[win_idx])
 
 
-def _check_1x2_edge_with_data(bets_list, ens, fair_h, fair_d, fair_a,
-                               max_h, max_d, max_a, outcome, min_edge=0.0):
-    for name, model_p, fair_p, best_o, win_idx in [
-        ("home", ens["home"], fair_h, max_h, 0),
-        ("draw", ens["draw"], fair_d, max_d, 1),
-        ("away", ens["away"], fair_a, max_a, 2),
-    ]:
-        if fair_p <= 0 or best_o <= 1.0:
-            continue
-        edge = ((model_p - fair_p) / fair_p) * 100
+def _check_1x2_edge_with_data(bets, probs, edges, best_odds, outcome, min_edge=0.0):
+    for win_idx in range(3):
+        edge = edges[win_idx]
         if edge >= min_edge:
             won = outcome == win_idx
-            bets_list.append((won, best_o, edge, model_p))
-
-
-def _update_home_away_elo(elo_dict, match):
-    """Maintain separate home and away ELO ratings."""
-    home = match["home_team"]
-    away = match["away_team"]
+            bets.push(won, best_odds[win_idx], edge, probs[win_idx])
 
-    if home not in elo_dict:
-        elo_dict[home] = {"home_elo": 1500.0, "away_elo": 1500.0}
-    if away not in elo_dict:
-        elo_dict[away] = {"home_elo": 1500.0, "away_elo": 1500.0}
 
-    home_r = elo_dict[home]["home_elo"]
-    away_r = elo_dict[away]["away_elo"]
-
-    expected_home = 1.0 / (1.0 + 10 ** ((away_r - home_r - 80) / 400))
-    expected_away = 1.0 - expected_home
-
-    if match["home_score"] > match["away_score"]:
-        actual_h, actual_a = 1.0, 0.0
-    elif match["home_score"] < match["away_score"]:
-        actual_h, actual_a = 0.0, 1.0
-    else:
-        actual_h, actual_a = 0.5, 0.5
+@njit(cache=True)
+def _home_away_elo_probs(home_idx, away_idx, scores, n_teams):
+    """Pre-match 1X2 probabilities from home/away split ELO, for every match.
 
+    Each team has a home rating and an away rating (arrays indexed by team
+    id). Match i is predicted from the ratings after matches 0..i-1, then
+    rated; the whole sequence runs in one compiled pass.
+    """
+    n = home_idx.shape[0]
+    home_elos = np.full(n_teams, 1500.0)
+    away_elos = np.full(n_teams, 1500.0)
+    probs = np.empty((n, 3))
     k = 40
-    elo_dict[home]["home_elo"] += k * (actual_h - expected_home)
-    elo_dict[away]["away_elo"] += k * (actual_a - expected_away)
-
+    for i in range(n):
+        home, away = home_idx[i], away_idx[i]
+        hr = home_elos[home]
+        ar = away_elos[away]
 
-def _predict_home_away_elo(elo_dict, home_team, away_team):
-    """Predict using home/away split ELO."""
-    hr = elo_dict.get(home_team, {"home_elo": 1500})["home_elo"]
-    ar = elo_dict.get(away_team, {"away_elo": 1500})["away_elo"]
+        expected_home = 1.0 / (1.0 + 10 ** ((ar - hr - 80) / 400))
 
-    expected_home = 1.0 / (1.0 + 10 ** ((ar - hr - 80) / 400))
+        elo_diff = abs(hr - ar)
+        draw_prob = max(0.10, min(0.35, 0.28 - elo_diff / 2500))
+        remaining = 1.0 - draw_prob
+        probs[i, 0] = remaining * expected_home
+        probs[i, 1] = draw_prob
+        probs[i, 2] = remaining * (1.0 - expected_home)
 
-    elo_diff = abs(hr - ar)
-    draw_prob = max(0.10, min(0.35, 0.28 - elo_diff / 2500))
-    remaining = 1.0 - draw_prob
+        home_score, away_score = scores[i, 0], scores[i, 1]
+        if home_score > away_score:
+            actual_h, actual_a = 1.0, 0.0
+        elif home_score < away_score:
+            actual_h, actual_a = 0.0, 1.0
+        else:
+            actual_h, actual_a = 0.5, 0.5
 
-    return {
-        "home": remaining * expected_home,
-        "draw": draw_prob,
-        "away": remaining * (1.0 - expected_home),
-    }
+        home_elos[home] = hr + k * (actual_h - expected_home)
+        away_elos[away] = ar + k * (actual_a - (1.0 - expected_home))
+    return probs
 
 
+@njit(cache=True)
 def _prob_cover_ah(score_matrix, ah_line):
-    """P(home_goals - away_goals > -ah_line) from score matrix."""
+    """P(home_goals - away_goals > -ah_line) from score matrix (compiled with numba)."""
     n = score_matrix.shape[0]
     prob = 0.0
     for i in range(n):
@@ -561,6 +770,12 @@ if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--league", default="ligue_1")
+    parser.add_argument("--leagues", nargs="+", help="Several leagues, tested in parallel")
     parser.add_argument("--seasons", nargs="+", type=int, default=[2020, 2021, 2022, 2023, 2024])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (leagues and Dixon-Coles refits)")
     args = parser.parse_args()
-    run_all_hypotheses(args.league, args.seasons)
+    if args.leagues:
+        run_leagues(args.leagues, args.seasons, workers=args.workers)
+    else:
+        run_all_hypotheses(args.league, args.seasons, workers=args.workers)
@@ -10,6 +10,8 @@ This is the gold standard for backtesting betting models:
 """
 
 import io
+import os
+import pickle
 from pathlib import Path
 
 import httpx
@@ -209,6 +211,34 @@ def _get_odds(row: pd.Series, *col_names: str) -> float:
     return 0.0
 
 
+def _load_season(league: str, season: int, cache_dir: Path | None) -> list[dict]:
+    """Download (or read the cached CSV) and parse one season.
+
+    With a cache_dir, the parsed matches are also pickled next to the CSV
+    and reused while newer than both the CSV and this parser.
+    """
+    if not cache_dir:
+        return parse_season(download_season_csv(league, season), season)
+
+    code = LEAGUE_CODES.get(league, league)
+    sc = _season_code(season)
+    csv_path = cache_dir / f"{code}_{sc}.csv"
+    parsed_path = cache_dir / f"{code}_{sc}.parsed.pkl"
+    if parsed_path.exists() and csv_path.exists():
+        version = max(csv_path.stat().st_mtime, Path(__file__).stat().st_mtime)
+        if parsed_path.stat().st_mtime > version:
+            with open(parsed_path, "rb") as f:
+                return pickle.load(f)
+
+    matches = parse_season(download_season_csv(league, season, cache_dir), season)
+
+    tmp = parsed_path.with_suffix(".pkl.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(matches, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, parsed_path)
+    return matches
+
+
 def load_historical_data(
     league: str = "ligue_1",
     seasons: list[int] | None = None,
@@ -219,7 +249,7 @@ def load_historical_data(
     Args:
         league: League key.
         seasons: List of season start years. Default: 2020-2024.
-        cache_dir: Where to cache downloaded CSVs.
+        cache_dir: Where to cache downloaded CSVs (and their parsed matches).
 
     Returns:
         Combined list of match dicts sorted by kickoff date.
@@ -230,9 +260,7 @@ def load_historical_data(
     all_matches = []
     for season in seasons:
         try:
-            df = download_season_csv(league, season, cache_dir)
-            matches = parse_season(df, season)
-            all_matches.extend(matches)
+            all_matches.extend(_load_season(league, season, cache_dir))
         except Exception as e:
             logger.warning(f"Failed to load {league} {season}: {e}")
 
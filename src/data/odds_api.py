@@ -70,90 +70,95 @@ class OddsAPIClient:
         self.client.close()
 
 
+# Best-odds keys for each supported totals line: point -> (over key, under key)
+TOTALS_KEYS = {1.5: ("over15", "under15"), 2.5: ("over25", "under25"), 3.5: ("over35", "under35")}
+
+# Sanity check: filter absurd odds for totals markets.
+# Over 1.5 should never be above ~3.0, Under 1.5 never above ~10.0,
+# Over 2.5 never above ~6.0, Over 3.5 never above ~10.0.
+MAX_SANE_ODDS = {
+    "over15": 3.5, "under15": 12.0,
+    "over25": 7.0, "under25": 7.0,
+    "over35": 12.0, "under35": 4.0,
+}
+
+BEST_ODDS_KEYS = (
+    "home", "draw", "away",
+    "over15", "under15", "over25", "under25", "over35", "under35",
+    "ah_home", "ah_away",
+)
+
+
 def extract_best_odds(match_odds: dict) -> dict:
     """Extract best available odds across all bookmakers for a match.
 
     Returns dict with keys: home, draw, away, over15, under15, over25, under25,
     over35, under35, ah_home, ah_away and their associated best bookmaker.
     """
-    best = {
-        "home": {"odds": 0, "bookmaker": None},
-        "draw": {"odds": 0, "bookmaker": None},
-        "away": {"odds": 0, "bookmaker": None},
-        "over15": {"odds": 0, "bookmaker": None},
-        "under15": {"odds": 0, "bookmaker": None},
-        "over25": {"odds": 0, "bookmaker": None},
-        "under25": {"odds": 0, "bookmaker": None},
-        "over35": {"odds": 0, "bookmaker": None},
-        "under35": {"odds": 0, "bookmaker": None},
-        "ah_home": {"odds": 0, "bookmaker": None, "line": None},
-        "ah_away": {"odds": 0, "bookmaker": None, "line": None},
+    # Scan into flat price/bookmaker tables; the nested result is built once at the end
+    prices = dict.fromkeys(BEST_ODDS_KEYS, 0)
+    books = dict.fromkeys(BEST_ODDS_KEYS)
+    lines = {"ah_home": None, "ah_away": None}
+
+    # Outcome name -> key; later entries win, giving home > away > Draw precedence
+    h2h_keys = {
+        "Draw": "draw",
+        match_odds.get("away_team"): "away",
+        match_odds.get("home_team"): "home",
     }
+    spreads_home = match_odds.get("home_team", "")
 
     for bookmaker in match_odds.get("bookmakers", []):
         name = bookmaker["title"]
         for market in bookmaker.get("markets", []):
-            if market["key"] == "h2h":
+            market_key = market["key"]
+            if market_key == "h2h":
                 for outcome in market["outcomes"]:
-                    if outcome["name"] == match_odds.get("home_team"):
-                        if outcome["price"] > best["home"]["odds"]:
-                            best["home"] = {"odds": outcome["price"], "bookmaker": name}
-                    elif outcome["name"] == match_odds.get("away_team"):
-                        if outcome["price"] > best["away"]["odds"]:
-                            best["away"] = {"odds": outcome["price"], "bookmaker": name}
-                    elif outcome["name"] == "Draw":
-                        if outcome["price"] > best["draw"]["odds"]:
-                            best["draw"] = {"odds": outcome["price"], "bookmaker": name}
-            elif market["key"] == "totals":
+                    key = h2h_keys.get(outcome["name"])
+                    if key is not None and outcome["price"] > prices[key]:
+                        prices[key] = outcome["price"]
+                        books[key] = name
+            elif market_key == "totals":
                 for outcome in market["outcomes"]:
-                    point = outcome.get("point", 2.5)
-                    is_over = outcome["name"] == "Over"
-
-                    if point == 1.5:
-                        key = "over15" if is_over else "under15"
-                        if outcome["price"] > best[key]["odds"]:
-                            best[key] = {"odds": outcome["price"], "bookmaker": name}
-                    elif point == 2.5:
-                        key = "over25" if is_over else "under25"
-                        if outcome["price"] > best[key]["odds"]:
-                            best[key] = {"odds": outcome["price"], "bookmaker": name}
-                    elif point == 3.5:
-                        key = "over35" if is_over else "under35"
-                        if outcome["price"] > best[key]["odds"]:
-                            best[key] = {"odds": outcome["price"], "bookmaker": name}
-            elif market["key"] == "spreads":
-                home_team = match_odds.get("home_team", "")
+                    keys = TOTALS_KEYS.get(outcome.get("point", 2.5))
+                    if keys is None:
+                        continue
+                    key = keys[0] if outcome["name"] == "Over" else keys[1]
+                    if outcome["price"] > prices[key]:
+                        prices[key] = outcome["price"]
+                        books[key] = name
+            elif market_key == "spreads":
                 for outcome in market["outcomes"]:
                     point = outcome.get("point")
                     price = outcome.get("price", 0)
                     if point is None or price <= 1.0:
                         continue
-                    is_home = outcome.get("name") == home_team
+                    is_home = outcome.get("name") == spreads_home
                     if is_home and point < 0:
                         # Home handicap (e.g., -1.5)
-                        if price > best["ah_home"]["odds"]:
-                            best["ah_home"] = {"odds": price, "bookmaker": name, "line": point}
+                        key = "ah_home"
                     elif not is_home and point > 0:
                         # Away handicap (e.g., +1.5)
-                        if price > best["ah_away"]["odds"]:
-                            best["ah_away"] = {"odds": price, "bookmaker": name, "line": point}
-
-    # Sanity check: filter absurd odds for totals markets.
-    # Over 1.5 should never be above ~3.0, Under 1.5 never above ~10.0,
-    # Over 2.5 never above ~6.0, Over 3.5 never above ~10.0.
-    MAX_SANE_ODDS = {
-        "over15": 3.5, "under15": 12.0,
-        "over25": 7.0, "under25": 7.0,
-        "over35": 12.0, "under35": 4.0,
-    }
+                        key = "ah_away"
+                    else:
+                        continue
+                    if price > prices[key]:
+                        prices[key] = price
+                        books[key] = name
+                        lines[key] = point
+
     for key, max_odds in MAX_SANE_ODDS.items():
-        if best[key]["odds"] > max_odds:
+        if prices[key] > max_odds:
             logger.warning(
-                f"Filtering absurd {key} odds: {best[key]['odds']} > {max_odds} "
-                f"(bookmaker: {best[key]['bookmaker']})"
+                f"Filtering absurd {key} odds: {prices[key]} > {max_odds} "
+                f"(bookmaker: {books[key]})"
             )
-            best[key] = {"odds": 0, "bookmaker": None}
+            prices[key] = 0
+            books[key] = None
 
+    best = {key: {"odds": prices[key], "bookmaker": books[key]} for key in BEST_ODDS_KEYS}
+    for key, line in lines.items():
+        best[key]["line"] = line
     return best
 
 
@@ -162,7 +167,7 @@ def remove_margin(home_odds: float, draw_odds: float, away_odds: float) -> dict:
 
     This is CRITICAL for correct edge calculation.
     """
-    if not all(o > 1.0 for o in [home_odds, draw_odds, away_odds]):
+    if not (home_odds > 1.0 and draw_odds > 1.0 and away_odds > 1.0):
         return {"home": 0, "draw": 0, "away": 0, "overround": 0}
 
     raw_home = 1 / home_odds
@@ -87,14 +87,18 @@ class EnsemblePredictor:
         home_team: str,
         away_team: str,
         match_features: dict[str, float] | None = None,
+        dc_pred: MatchPrediction | None = None,
     ) -> EnsemblePrediction:
         """Generate ensemble prediction.
 
         If XGBoost model is available and match_features provided,
         uses XGBoost for 1X2. Otherwise falls back to weighted average.
+        A dc_pred already computed for this fixture can be passed in to
+        skip the Dixon-Coles score-matrix evaluation.
         """
         # Dixon-Coles prediction (always needed for over/under + BTTS)
-        dc_pred = self.dc.predict(home_team, away_team)
+        if dc_pred is None:
+            dc_pred = self.dc.predict(home_team, away_team)
         dc_probs = {"home": dc_pred.home_win, "draw": dc_pred.draw, "away": dc_pred.away_win}
 
         # ELO prediction (1X2 only)
@@ -0,0 +1,35 @@
+"""Tests for the bankroll simulator's bet loading."""
+
+import json
+
+import pytest
+
+from scripts.bankroll_simulation import load_bets_arrays, simulate
+
+
+def _write_bets(path, bets):
+    path.write_text(json.dumps(bets))
+    return str(path)
+
+
+def test_bets_without_market_type(tmp_path):
+    """Bet lists without market_type (e.g. backtest_bets.json) load and simulate."""
+    bets = [
+        {"date": "2020-12-06 00:00:00", "market": "away", "model_prob": 0.45,
+         "edge_pct": 8.0, "best_odds": 2.5, "won": True},
+        {"date": "2020-12-05 00:00:00", "market": "home", "model_prob": 0.2079,
+         "edge_pct": 41.3, "best_odds": 7.2, "won": False},
+    ]
+    arrays = load_bets_arrays(_write_bets(tmp_path / "bets.json", bets))
+
+    assert arrays["days"].tolist() == ["2020-12-05 00:00:00", "2020-12-06 00:00:00"]
+    assert arrays["best_odds"].tolist() == pytest.approx([7.2, 2.5])
+
+    result = simulate(arrays, strategy="flat", flat_pct=0.02)
+    assert result["n_bets"] == 2
+    assert result["n_wins"] == 1
+    # 1000 -> lose 20 -> 980, then win 2% of 980 at 2.5
+    assert result["final_bankroll"] == pytest.approx(980 + 980 * 0.02 * 1.5, abs=0.01)
+
+    # Without a market type, no bet passes a market filter
+    assert simulate(arrays, market_filter=["corner_1x2"])["n_bets"] == 0
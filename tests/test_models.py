@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 
 from src.models.dixon_coles import DixonColesModel, MatchResult
 from src.models.elo import EloRating, EloMatch
+from src.models.ensemble import EnsemblePredictor
 
 
 def _make_matches(n: int = 200) -> list[MatchResult]:
@@ -83,6 +84,20 @@ class TestDixonColes:
         assert 0 < pred.home_win < 1
         assert 0 < pred.draw < 1
 
+    def test_predict_batch_matches_predict(self):
+        """Batched predictions should equal one-by-one predictions."""
+        model = DixonColesModel()
+        model.fit(_make_matches(200))
+        homes = ["Team_0", "Team_3", "Unknown_FC"]
+        aways = ["Team_1", "Team_7", "Team_2"]
+        for batch_pred, home, away in zip(model.predict_batch(homes, aways), homes, aways):
+            pred = model.predict(home, away)
+            assert batch_pred.home_win == pytest.approx(pred.home_win, abs=1e-12)
+            assert batch_pred.draw == pytest.approx(pred.draw, abs=1e-12)
+            assert batch_pred.over_25 == pytest.approx(pred.over_25, abs=1e-12)
+            assert batch_pred.btts_yes == pytest.approx(pred.btts_yes, abs=1e-12)
+            np.testing.assert_allclose(batch_pred.score_matrix, pred.score_matrix, atol=1e-12)
+
 
 class TestElo:
     def test_initial_rating(self):
@@ -118,3 +133,16 @@ class TestElo:
         elo.ratings = {"Strong": 1700, "Weak": 1300}
         pred = elo.predict_1x2("Strong", "Weak")
         assert pred["home"] > pred["away"]
+
+
+class TestEnsemble:
+    def test_precomputed_dc_pred_matches(self):
+        """Passing the fixture's DC prediction should not change the output."""
+        model = DixonColesModel()
+        model.fit(_make_matches(200))
+        ensemble = EnsemblePredictor(dc_model=model, elo_model=EloRating())
+        pred = ensemble.predict("Team_0", "Team_3")
+        reused = ensemble.predict("Team_0", "Team_3", dc_pred=model.predict("Team_0", "Team_3"))
+        assert reused.home_prob == pred.home_prob
+        assert reused.draw_prob == pred.draw_prob
+        assert reused.over_25_prob == pred.over_25_prob